@@ -14,6 +14,63 @@ class Settings(BaseSettings):
 
     save_path: str = "training_plan.csv"
 
+    mcp_idle_timeout_s: float = 300.0
+    mcp_health_check_interval_s: float = 30.0
+    mcp_startup_timeout_s: float = 60.0
+
+    garmin_cache_dir: str = "data/garmin"
+    garmin_lookback_days: int = 90
+    garmin_chunk_days: int = 30
+
+    embedding_cache_path: str = "data/embeddings.sqlite"
+    embedding_cache_max_mb: int = 512
+
+    retrieval_cache_size: int = 256
+    retrieval_cache_ttl_s: float = 3600.0
+    # BM25 and vector rankings fused by reciprocal rank; lexical results alone
+    # when the query embedding is not back within the budget
+    retrieval_hybrid: bool = True
+    retrieval_vector_budget_s: float = 2.0
+    retrieval_rrf_k: int = 60
+
+    # chunks whose word 3-gram Jaccard similarity (MinHash estimate) reaches
+    # this are near-duplicates: skipped at ingest and in retrieved context
+    near_dup: bool = True
+    near_dup_jaccard: float = 0.8
+
+    # RAG context cut down to the sentences closest to the query before the
+    # coach sees it; scored by BM25, or by cached embeddings ("embeddings")
+    rag_compress: bool = True
+    rag_compress_scorer: str = "lexical"
+    rag_context_tokens: int = 1200
+
+    # whole coach prompt, system part included; see my_coach/llm/prompt.py
+    coach_prompt_tokens: int = 6000
+
+    # conversation history: once it is past `history_fold_tokens`, discuss
+    # folds all but the newest `history_tail_tokens` into a rolling summary;
+    # `history_max_tokens` is the hard cap of State.messages
+    history_tail_tokens: int = 1500
+    history_fold_tokens: int = 3000
+    history_max_tokens: int = 8000
+
+    # a modify request whose dates span at most this many days rewrites only
+    # those sessions; wider or undated ones regenerate the whole plan
+    plan_delta: bool = True
+    plan_delta_max_days: int = 14
+
+    # how plans are written into prompts: "rows" or "weeks", see
+    # my_coach/llm/plan_format.py and scripts/bench_plan_format.py
+    plan_encoding: str = "rows"
+
+    # new plans are shown as a locally rendered table; with this on, llm_small
+    # writes a short justification alongside instead of the coach's own
+    summary_blurb: bool = False
+
+    # search knobs of approximate indexes (see scripts/ingest.py --index-type)
+    faiss_nprobe: int = 8
+    faiss_ef_search: int = 64
+
     model_config = SettingsConfigDict(
         env_file=".env",
         extra="ignore",  # <- key line to avoid the error
@@ -1,4 +1,4 @@
-from typing import Literal
+from typing import Literal, Optional
 from pydantic import BaseModel, Field, field_validator
 from datetime import date, datetime
 
@@ -13,6 +13,14 @@ class ModifyRoute(BaseModel):
     mode: Literal["modify", "continue"] = Field(
         description="The chosen mode. 'modify' = modify the current plan, 'continue' = don't want to modify."
     )
+    start: Optional[date] = Field(
+        default=None,
+        description="First date (YYYY-MM-DD) of the sessions the change touches. Null if the whole plan must be redone or mode is 'continue'.",
+    )
+    end: Optional[date] = Field(
+        default=None,
+        description="Last date (YYYY-MM-DD) of the sessions the change touches. Null if the whole plan must be redone or mode is 'continue'.",
+    )
 
 
 class TrainingItem(BaseModel):
@@ -27,6 +35,8 @@ class TrainingItem(BaseModel):
     @field_validator("Date", mode="before")
     @classmethod
     def parse_date(cls, value):
+        if isinstance(value, date):
+            return value
         if isinstance(value, str):
             s = value.strip()
             for fmt in ("%d-%m-%Y", "%Y-%m-%d"):
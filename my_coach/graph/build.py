@@ -1,57 +1,61 @@
 from langgraph.graph import StateGraph, START, END
 from langgraph.checkpoint.memory import MemorySaver
+from langchain_core.runnables import RunnableLambda
 from .state import State
 from .routes import (
     route_after_question,
-    route_garmin,
+    route_context,
+    route_delta,
     route_modify,
     route_start,
-    route_tavily,
+    route_summary,
 )
 from . import nodes
 
 
-def build_graph(llms):
-    llm_small = llms["llm_small"]
-    llm_coach = llms["llm_coach"]
-    llm_modify = llms["llm_modify"]
-
-    def questionnaire(state: State):
-        return nodes.questionnaire_node(state, llm_small)
-
-    def discuss(state: State):
-        return nodes.discuss_node(state, llm_small)
+def _dual(name, sync_node, async_node, llm):
+    """Node runnable from both `graph.stream` and `graph.astream`."""
 
-    def modify(state: State):
-        return nodes.modify_node(state, llm_modify)
+    def run(state: State):
+        return sync_node(state, llm)
 
-    def load(state: State):
-        return nodes.load_node(state, llm_small)
+    async def arun(state: State):
+        return await async_node(state, llm)
 
-    def garmin(state: State):
-        return nodes.garmin_node(state, llm_small)
+    return RunnableLambda(run, afunc=arun, name=name)
 
-    def search(state: State):
-        return nodes.research_node(state, llm_small)
 
-    def coach(state: State):
-        return nodes.coach_node(state, llm_coach)
+def build_graph(llms):
+    llm_small = llms["llm_small"]
+    llm_coach = llms["llm_coach"]
+    llm_modify = llms["llm_modify"]
 
-    def save_node(state: State):
-        return nodes.save_node(state, llm_small)
+    questionnaire = _dual(
+        "questionnaire",
+        nodes.questionnaire_node,
+        nodes.aquestionnaire_node,
+        llm_small,
+    )
+    discuss = _dual("discuss", nodes.discuss_node, nodes.adiscuss_node, llm_small)
+    modify = _dual("modify", nodes.modify_node, nodes.amodify_node, llm_modify)
+    load = _dual("load", nodes.load_node, nodes.aload_node, llm_small)
+    garmin = _dual("garmin", nodes.garmin_node, nodes.agarmin_node, llm_small)
+    search = _dual("search", nodes.research_node, nodes.aresearch_node, llm_small)
+    coach = _dual("coach", nodes.coach_node, nodes.acoach_node, llm_coach)
+    delta = _dual("delta", nodes.delta_node, nodes.adelta_node, llm_coach)
+    save_node = _dual("save_node", nodes.save_node, nodes.asave_node, llm_small)
+    summary = _dual("summary", nodes.summary_node, nodes.asummary_node, llm_small)
+    blurb = _dual("blurb", nodes.blurb_node, nodes.ablurb_node, llm_small)
+    retriever = _dual(
+        "retriever", nodes.retriever_node, nodes.aretriever_node, llm_small
+    )
 
     def save_confirm(state: State):
         return nodes.save_confirm_node(state)
 
-    def summary(state: State):
-        return nodes.summary_node(state, llm_small)
-
     def new_plan_entry(state: State):
         return {}
 
-    def retriever(state: State):
-        return nodes.retriever_node(state, llm_small)
-
     g = StateGraph(State)
 
     g.add_node("questionnaire", questionnaire)
@@ -64,9 +68,11 @@ def build_graph(llms):
     g.add_node("retriever", retriever)
     g.add_node("search", search)
     g.add_node("coach", coach)
+    g.add_node("delta", delta)
     g.add_node("save_node", save_node)
     g.add_node("save_confirm", save_confirm)
     g.add_node("summary", summary)
+    g.add_node("blurb", blurb)
 
     g.add_conditional_edges(
         START,
@@ -87,32 +93,32 @@ def build_graph(llms):
         },
     )
 
+    # context branches run in the same superstep; coach fires once they all finish
     g.add_conditional_edges(
         "new_plan_entry",
-        route_garmin,
-        {
-            "garmin": "garmin",
-            "search": "search",
-            "coach": "retriever",
-        },
+        route_context,
+        ["garmin", "search", "retriever"],
     )
+    g.add_edge("garmin", "coach")
+    g.add_edge("search", "coach")
+    g.add_edge("retriever", "coach")
 
+    g.add_edge("coach", "save_node")
+    # a dated change rewrites only its sessions, without new context; one
+    # that strays outside its window falls back to the whole plan
     g.add_conditional_edges(
-        "garmin",
-        route_tavily,
+        "delta",
+        route_delta,
         {
-            "coach": "retriever",
-            "search": "search",
+            "save": "save_node",
+            "modify": "new_plan_entry",
         },
     )
-    g.add_edge("garmin", "search")
-
-    g.add_edge("search", "retriever")
-    g.add_edge("retriever", "coach")
-    g.add_edge("coach", "save_node")
     g.add_edge("save_node", "save_confirm")
-    g.add_edge("save_confirm", "summary")
+    # the table is rendered locally; the optional blurb streams alongside it
+    g.add_conditional_edges("save_confirm", route_summary, ["summary", "blurb"])
     g.add_edge("summary", END)
+    g.add_edge("blurb", END)
 
     g.add_edge("load", "discuss")
     g.add_edge("discuss", END)
@@ -123,6 +129,7 @@ def build_graph(llms):
         {
             "continue": "discuss",
             "modify": "new_plan_entry",
+            "delta": "delta",
         },
     )
 
@@ -1,12 +1,38 @@
-from typing import List, Dict
+import asyncio
+from typing import Any, List, Dict
 from datetime import datetime, timedelta
 import json
-from langchain_core.messages import AIMessage, SystemMessage, HumanMessage
+import logging
+from langgraph.constants import TAG_NOSTREAM
+from langchain_core.messages import (
+    AIMessage,
+    SystemMessage,
+    HumanMessage,
+    RemoveMessage,
+)
 from my_coach.tools_langchain.tool_save_training_plan import save_training_plan
 from my_coach.tools_langchain.tool_load_training_plan import load_training_plan
 from my_coach.tools_langchain.tool_search import tool_search
-from my_coach.mcp.mcp_garmin import garmin_tool
-from .utils import _get_fitness_summary, _build_query, _retrieve
+from my_coach.config import settings
+from my_coach.llm.plan_format import encode_plan, encode_rows, sessions
+from my_coach.llm.prompt import Section, pack_prompt
+from my_coach.llm.tokens import count_tokens, truncate_tokens
+from my_coach.mcp.garmin_store import afetch_activities, fetch_activities
+from . import prefetch
+from .render import render_plan
+from .state import message_tokens, tail_start
+from .utils import (
+    _get_fitness_summary,
+    _build_query,
+    _garmin_window,
+    _delta_window,
+    _latest_request,
+    _rag_context,
+    _rag_queries,
+    _replace_window,
+)
+
+logger = logging.getLogger(__name__)
 
 QUESTIONNAIRE: Dict[str, str] = {
     "sport": "The sport (running / cycling / trail / triathlon) you want a program for",
@@ -18,6 +44,7 @@ QUESTIONNAIRE: Dict[str, str] = {
     "constraints": "Constraints (injuries, travel, equipment, surfaces)",
     "additional_remarks": "Additional specification the user might want to work on ?",
 }
+GARMIN_FIELDS = ("current_weekly_volume", "longest_recent")
 FIELDS: List[str] = [
     "sport",
     "goal",
@@ -30,49 +57,42 @@ FIELDS: List[str] = [
 ]
 
 
-def retriever_node(state, llm):
-    specs = state.get("specs", {}) or {}
-    modify_query = state.get("modify_query") or None
-    garmin_data = (state.get("garmin") or "").strip()
+def questionnaire_fields(garmin_consent) -> List[str]:
+    # Garmin data replaces the self-reported volume questions
+    if garmin_consent:
+        return [f for f in FIELDS if f not in GARMIN_FIELDS]
+    return FIELDS
 
-    # simple formatter
-    parts = []
-    for k, v in specs.items():
-        if v:
-            parts.append(f"{k}: {v}")
 
-    if garmin_data:
-        parts.append(f"garmin data: {garmin_data}")
+def retriever_node(state, llm):
+    rag_ctx = prefetch.result(prefetch.lookup(state, "rag_ctx"))
+    if rag_ctx is None:
+        rag_ctx = _rag_context(_rag_queries(state), k=4)
 
-    if modify_query:
-        parts.append("additional request: " + " ".join(modify_query))
+    return {"rag_ctx": rag_ctx}
 
-    q = " | ".join(parts)
-    _, bib, ctx = _retrieve(q, k=4)
 
-    rag_ctx = {"brief": ctx, "sources": bib}
+async def aretriever_node(state, llm):
+    rag_ctx = await prefetch.aresult(prefetch.lookup(state, "rag_ctx"))
+    if rag_ctx is None:
+        # FAISS search and the embedding call are blocking
+        rag_ctx = await asyncio.to_thread(_rag_context, _rag_queries(state), 4)
 
     return {"rag_ctx": rag_ctx}
 
 
-def research_node(state, llm):
-    specs = state.get("specs", {})
-    modify_query = state.get("modify_query", "")
+def _research_query(state) -> str:
+    # copy: runs alongside retriever/garmin, which read the same specs
+    specs = dict(state.get("specs") or {})
+    request = _latest_request(state.get("modify_query"))
 
-    if specs.get("additional_remarks"):
-        specs["additional_remarks"] += f"\n {modify_query}"
+    if specs.get("additional_remarks") and request:
+        specs["additional_remarks"] += f"\n {request}"
 
-    query = _build_query(specs)
+    return _build_query(specs)
 
-    # search
-
-    try:
-        hits = tool_search.invoke({"query": query})
-    except Exception:
-        hits = None
-
-    results = (hits or {}).get("results", [])
 
+def _research_messages(results: list) -> list:
     sys = (
         "You compress web results into a small, strictly grounded brief for a coach.\n"
         "Rules:\n"
@@ -89,18 +109,48 @@ def research_node(state, llm):
         or "No results."
     )
 
-    brief = llm.invoke([SystemMessage(content=sys), HumanMessage(content=pack)])
+    return [SystemMessage(content=sys), HumanMessage(content=pack)]
+
 
-    web_ctx = {
+def _web_ctx(brief, results: list) -> Dict[str, Any]:
+    return {
         "brief": brief.content,
         "sources": [{"title": r.get("title"), "url": r.get("url")} for r in results],
     }
 
-    return {"web_ctx": web_ctx}
 
+def research_node(state, llm):
+    query = _research_query(state)
 
-def discuss_node(state, llm):
-    plan = state.get("plan", [])
+    # search
+
+    try:
+        hits = tool_search.invoke({"query": query})
+    except Exception:
+        hits = None
+
+    results = (hits or {}).get("results", [])
+    brief = llm.invoke(_research_messages(results))
+
+    return {"web_ctx": _web_ctx(brief, results)}
+
+
+async def aresearch_node(state, llm):
+    query = _research_query(state)
+
+    try:
+        hits = await tool_search.ainvoke({"query": query})
+    except Exception:
+        hits = None
+
+    results = (hits or {}).get("results", [])
+    brief = await llm.ainvoke(_research_messages(results))
+
+    return {"web_ctx": _web_ctx(brief, results)}
+
+
+def _discuss_messages(state) -> list:
+    plan = encode_plan(state.get("plan") or [], settings.plan_encoding)
     sys = (
         "You are a professional endurance coach (running, cycling, trail, triathlon). "
         "Ask what the user want to modify to its current training plan."
@@ -111,14 +161,106 @@ def discuss_node(state, llm):
         "======\n"
         f"THE PLAN:\n {plan}"
     )
+    if state.get("history_summary"):
+        sys += "\n======\nEARLIER IN THE CONVERSATION:\n" + state["history_summary"]
+
+    return [SystemMessage(content=sys), *state["messages"]]
+
+
+def _history_to_fold(state) -> list:
+    """Messages to fold into the summary: all but the newest
+    `history_tail_tokens`, once the history is past `history_fold_tokens`.
+
+    Folding a block at a time keeps it to one summary call every few turns,
+    each over a bounded input.
+    """
+    messages = state["messages"]
+    if sum(message_tokens(m) for m in messages) <= settings.history_fold_tokens:
+        return []
+    return messages[: tail_start(messages, settings.history_tail_tokens)]
+
+
+def _fold_messages(summary, folded: list) -> list:
+    sys = (
+        "Update the running summary of a coaching conversation with the new turns. "
+        "Keep what later turns may rely on: facts about the athlete, changes asked for "
+        "and made to the plan, decisions and open questions. "
+        "Leave out greetings and plan tables, the current plan is given separately. "
+        "Plain text, at most 150 words."
+    )
+    turns = "\n".join(
+        f"{'USER' if isinstance(m, HumanMessage) else 'COACH'}: "
+        f"{truncate_tokens(str(m.content), 300)}"
+        for m in folded
+    )
+    hum = f"SUMMARY SO FAR:\n{summary or 'None.'}\n\nNEW TURNS:\n{turns}"
+
+    return [SystemMessage(content=sys), HumanMessage(content=hum)]
+
+
+def _fold_llm(llm):
+    # the summary is internal: keep its tokens out of stream_mode="messages",
+    # which the UI shows as the answer
+    return llm.with_config(tags=[TAG_NOSTREAM])
+
 
-    resp = llm.invoke([SystemMessage(content=sys), *state["messages"]])
+def _discuss_update(state, resp, folded: list, summary) -> Dict[str, Any]:
     resp.additional_kwargs["visible"] = False
+    if not folded:
+        return {"messages": [resp]}
+    if isinstance(summary, Exception):
+        # keep the turns; the next discuss turn tries again
+        logger.warning("history summary failed: %s", summary)
+        return {"messages": [resp]}
+
+    logger.info(
+        "folded %d messages into the history summary (%d tokens)",
+        len(folded),
+        count_tokens(summary.content),
+    )
+    return {
+        "messages": [RemoveMessage(id=m.id) for m in folded] + [resp],
+        "history_summary": summary.content,
+    }
 
-    return {"messages": [resp]}
 
+def discuss_node(state, llm):
+    resp = llm.invoke(_discuss_messages(state))
+    folded, summary = _history_to_fold(state), None
+    if folded:
+        try:
+            summary = _fold_llm(llm).invoke(
+                _fold_messages(state.get("history_summary"), folded)
+            )
+        except Exception as e:
+            summary = e
 
-def questionnaire_node(state, llm):
+    return _discuss_update(state, resp, folded, summary)
+
+
+async def adiscuss_node(state, llm):
+    folded = _history_to_fold(state)
+    if not folded:
+        resp = await llm.ainvoke(_discuss_messages(state))
+        return _discuss_update(state, resp, folded, None)
+
+    # the summary is for the next turns: write it alongside the answer
+    resp, summary = await asyncio.gather(
+        llm.ainvoke(_discuss_messages(state)),
+        _fold_llm(llm).ainvoke(_fold_messages(state.get("history_summary"), folded)),
+        return_exceptions=True,
+    )
+    if isinstance(resp, Exception):
+        raise resp
+    return _discuss_update(state, resp, folded, summary)
+
+
+def _questionnaire_step(state):
+    """Record the last answer; return (asked, specs, messages to ask next or None).
+
+    `question_idx` counts the questions asked so far: the latest user message
+    answers fields[question_idx - 1].
+    """
     sys = (
         "Your role is simply to rewrite the question in a nice way for the user. \n"
         "Stay concise but not cold. The questions will tailor a training plan. Ensure continuity.\n"
@@ -129,88 +271,110 @@ def questionnaire_node(state, llm):
         ""
     )
 
-    step = state.get("question_idx", 0)
-    specs = state.get("specs", {})
-    garmin_consent = state.get("garmin_consent")
-
-    if garmin_consent and step == 0:
-        QUESTIONNAIRE.pop("current_weekly_volume", None)
-        QUESTIONNAIRE.pop("longest_recent", None)
-        FIELDS.remove("current_weekly_volume")
-        FIELDS.remove("longest_recent")
-
-    if step < len(QUESTIONNAIRE) and step != 0:
-        usr_resp = state["messages"][-1].content
-        specs[FIELDS[step - 1]] = usr_resp
-        step += 1
-
-    if step < len(FIELDS):
-        nf = FIELDS[step]
-        generic_q = QUESTIONNAIRE[nf]
-
-        resp = llm.invoke(
-            input=[
-                SystemMessage(content=sys),
-                *state["messages"],
-                HumanMessage(content="QUESTION:\n" + generic_q),
-            ]
-        )
+    asked = state.get("question_idx") or 0
+    specs = dict(state.get("specs") or {})
+    fields = questionnaire_fields(state.get("garmin_consent"))
 
-        new_q = resp.content
+    if 0 < asked <= len(fields):
+        specs[fields[asked - 1]] = state["messages"][-1].content
 
-        return {
-            "messages": [
-                AIMessage(content=new_q, additional_kwargs={"visible": False})
-            ],
-            "question_idx": step + 1 if step == 0 else step,
-            "specs": specs,
-        }
+    prefetch.schedule(state, specs)
 
-    else:
-        return {
-            "question_idx": step,
-            "specs": specs,
-        }
+    if asked >= len(fields):
+        return asked, specs, None
 
+    generic_q = QUESTIONNAIRE[fields[asked]]
+    msgs = [
+        SystemMessage(content=sys),
+        *state["messages"],
+        HumanMessage(content="QUESTION:\n" + generic_q),
+    ]
+    return asked, specs, msgs
 
-def garmin_node(state, llm):
-    try:
-        end = datetime.today().date()
-        start = end - timedelta(days=90)
-        payload = garmin_tool.invoke({"from_date": start, "to_date": end})
-        resp = json.loads(payload)
 
-        summary = _get_fitness_summary(resp)
+def _questionnaire_update(state, asked: int, specs: Dict[str, Any], resp):
+    # one past the last field once every answer is in (see route_after_question)
+    update = {
+        "question_idx": asked + 1,
+        "specs": specs,
+        "prefetch": prefetch.harvest(state),
+    }
+
+    if resp is not None:
+        update["messages"] = [
+            AIMessage(content=resp.content, additional_kwargs={"visible": False})
+        ]
 
-    except Exception as e:
-        raise ValueError(f"Error while loading Garmin data : {e}")
+    return update
+
+
+def questionnaire_node(state, llm):
+    asked, specs, msgs = _questionnaire_step(state)
+    resp = llm.invoke(input=msgs) if msgs else None
 
+    return _questionnaire_update(state, asked, specs, resp)
+
+
+async def aquestionnaire_node(state, llm):
+    asked, specs, msgs = _questionnaire_step(state)
+    resp = await llm.ainvoke(input=msgs) if msgs else None
+
+    return _questionnaire_update(state, asked, specs, resp)
+
+
+def _garmin_brief_messages(summary: str) -> list:
     sys = (
-        "You are an endurance coach. Given a short JSON of the last 90 days of Garmin data, "
+        f"You are an endurance coach. Given a short JSON of the last {settings.garmin_lookback_days} days of Garmin data, "
         "write 3–5 sentences that explain what it means for fitness and training readiness. "
         "Be clear, motivational, and avoid restating numbers verbatim. If empty, say so."
     )
 
     hum = f"Here is the summary JSON:\n{summary}"
 
-    brief = llm.invoke([SystemMessage(content=sys), HumanMessage(content=hum)])
+    return [SystemMessage(content=sys), HumanMessage(content=hum)]
+
+
+def garmin_node(state, llm):
+    summary = prefetch.result(prefetch.lookup(state, "garmin_data"))
+    if summary is None:
+        try:
+            summary = _get_fitness_summary(fetch_activities(**_garmin_window()))
+        except Exception as e:
+            raise ValueError(f"Error while loading Garmin data : {e}")
+
+    brief = llm.invoke(_garmin_brief_messages(summary))
     brief.additional_kwargs["visible"] = False
 
     return {"garmin_data": summary, "messages": [brief]}
 
 
-def coach_node(state, llm):
+async def agarmin_node(state, llm):
+    summary = await prefetch.aresult(prefetch.lookup(state, "garmin_data"))
+    if summary is None:
+        try:
+            activities = await afetch_activities(**_garmin_window())
+            summary = _get_fitness_summary(activities)
+        except Exception as e:
+            raise ValueError(f"Error while loading Garmin data : {e}")
+
+    brief = await llm.ainvoke(_garmin_brief_messages(summary))
+    brief.additional_kwargs["visible"] = False
+
+    return {"garmin_data": summary, "messages": [brief]}
+
+
+_DESCRIPTION_RULE = (
+    "DESCRIPTION: one medium line (≈120-200 chars, 1-2 sentences, no newlines). Include: sport; warm-up; main set; cool-down; intensity (pace/power/HR/RPE/temp). Avoid bare lines like “60 min Z1”."
+)
+
+
+def _coach_messages(state) -> list:
     specs_blob = json.dumps(state.get("specs") or {}, ensure_ascii=False)
     web_brief = state.get("web_ctx", {}).get("brief", "")
     rag_ctx = state.get("rag_ctx", {}).get("brief", "")
-    modify_query = state.get("modify_query")
+    request = _latest_request(state.get("modify_query"))
     garmin = state.get("garmin_data")
 
-    MAX_RAG_CHARS = 8000
-    MAX_WEB_BRIEF = 2000
-    rag_ctx = rag_ctx[:MAX_RAG_CHARS]
-    web_brief = web_brief[:MAX_WEB_BRIEF]
-
     sys = (
         f"Today is {datetime.today():%Y-%m-%d}.\n"
         "You are a professional endurance coach.\n"
@@ -218,25 +382,42 @@ def coach_node(state, llm):
         "STRICT : Respect availability of the user , current volume, constraints; progress conservatively.\n"
         "SCRICT GUIDELINE : Generate at most 28 sessions. \n"
         "Use evidence from RAG and web when helpful; place any citations only in the justification (e.g., [1], [W1]).\n"
-        "DESCRIPTION: one medium line (≈120-200 chars, 1-2 sentences, no newlines). Include: sport; warm-up; main set; cool-down; intensity (pace/power/HR/RPE/temp). Avoid bare lines like “60 min Z1”.\n"
+        f"{_DESCRIPTION_RULE}\n"
         "Rest day don't need to be stated."
     )
 
-    hum = (
-        "--- TRAINING SPEC (JSON) ---\n"
-        + specs_blob
-        + (f"\n--- GARMIN (bounds) ---\n{garmin}" if garmin else "")
-        + "\n--- EVIDENCE CONTEXT (RAG) ---\n"
-        + (rag_ctx[:8000] or "No local evidence.")
-        + "\n--- WEB BRIEF ---\n"
-        + (web_brief or "No web brief.")
+    # evidence, Garmin data and the web brief give way first (the web brief
+    # before the others); then the request, and the spec only once nothing
+    # else is left: same-priority sections are trimmed in order, so the spec
+    # needs a level of its own to outlast an oversized request
+    hum, stats = pack_prompt(
+        [
+            Section("TRAINING SPEC (JSON)", specs_blob, priority=0),
+            Section("GARMIN (bounds)", garmin or "", priority=3, min_tokens=150),
+            Section(
+                "EVIDENCE CONTEXT (RAG)",
+                rag_ctx,
+                priority=2,
+                min_tokens=400,
+                placeholder="No local evidence.",
+            ),
+            Section(
+                "WEB BRIEF",
+                web_brief,
+                priority=4,
+                min_tokens=150,
+                placeholder="No web brief.",
+            ),
+            Section("USER MODIFY REQUEST", request or "", priority=1),
+        ],
+        budget=settings.coach_prompt_tokens - count_tokens(sys),
     )
+    logger.info("coach prompt: %s", stats)
 
-    if modify_query:
-        hum += "\n--- USER MODIFY REQUEST ---\n" + "|".join(modify_query) + "\n"
+    return [SystemMessage(content=sys), HumanMessage(content=hum)]
 
-    resp = llm.invoke([SystemMessage(content=sys), HumanMessage(content=hum)])
 
+def _coach_update(state, resp) -> Dict[str, Any]:
     return {
         "plan": getattr(resp, "plan", state.get("plan", [])),
         "justification": getattr(resp, "justification", "No justification provided."),
@@ -244,34 +425,167 @@ def coach_node(state, llm):
     }
 
 
-def summary_node(state, llm):
+def coach_node(state, llm):
+    resp = llm.invoke(_coach_messages(state))
+
+    return _coach_update(state, resp)
+
+
+async def acoach_node(state, llm):
+    resp = await llm.ainvoke(_coach_messages(state))
+
+    return _coach_update(state, resp)
+
+
+def _delta_messages(state) -> list:
+    window = state["modify_window"]
+    start, end = window["start"], window["end"]
+    plan = sessions(state.get("plan") or [])
+    inside = [(d, t) for d, t in plan if start <= d <= end]
+    # a week either side, so the new sessions fit the load around them
+    week = timedelta(days=7)
+    around = [
+        (d, t)
+        for d, t in plan
+        if start - week <= d <= end + week and not start <= d <= end
+    ]
+
     sys = (
-        "Print the training plan as a clean markdown table, then add a 1–2 line justification. "
-        "End with a compact 'Sources' list using markdown links."
-        "Cite all the provided sources."
+        f"Today is {datetime.today():%Y-%m-%d}.\n"
+        "You are a professional endurance coach.\n"
+        "Populate the structured fields the caller requested; do not add extra keys or any commentary outside the structured output.\n"
+        f"Apply the user's request by rewriting ONLY the sessions from {start.isoformat()} to {end.isoformat()}. "
+        "Return every session of that window, the unchanged ones too, and nothing dated outside it; "
+        "the rest of the plan is kept as it is.\n"
+        "STRICT : Respect availability of the user , current volume, constraints; keep the load consistent with the surrounding weeks.\n"
+        f"{_DESCRIPTION_RULE}\n"
+        "Rest day don't need to be stated.\n"
+        "Justification: one sentence on what changed and why."
     )
 
-    web_sources = (state.get("web_ctx")).get("sources", [])
-    rag_sources = state.get("rag_ctx", {}).get("sources", [])
+    # the spec outranks everything: it is trimmed only once the rest is gone
+    hum, _ = pack_prompt(
+        [
+            Section(
+                "TRAINING SPEC (JSON)",
+                json.dumps(state.get("specs") or {}, ensure_ascii=False),
+                priority=0,
+            ),
+            Section(
+                f"SESSIONS TO REWRITE ({start.isoformat()} to {end.isoformat()})",
+                encode_rows([{"Date": d, "Description": t} for d, t in inside]),
+                priority=1,
+                placeholder="No sessions yet.",
+            ),
+            Section(
+                "KEPT SESSIONS AROUND THEM",
+                encode_rows([{"Date": d, "Description": t} for d, t in around]),
+                priority=2,
+                placeholder="No sessions in these weeks.",
+            ),
+            Section(
+                "USER MODIFY REQUEST",
+                _latest_request(state.get("modify_query")) or "",
+                priority=1,
+            ),
+        ],
+        budget=settings.coach_prompt_tokens - count_tokens(sys),
+    )
+
+    return [SystemMessage(content=sys), HumanMessage(content=hum)]
 
-    hum = json.dumps(
-        {
-            "plan": [item.model_dump_json() for item in state["plan"]],
-            "justification": state.get("justification"),
-            "sources": [web_sources, rag_sources],
-        },
-        ensure_ascii=False,
+
+def _delta_update(state, resp) -> Dict[str, Any]:
+    window = state["modify_window"]
+    try:
+        plan = _replace_window(
+            state.get("plan") or [], resp.plan, window["start"], window["end"]
+        )
+    except ValueError as e:
+        # modify_mode stays "modify": route_delta redoes the whole plan
+        logger.warning("plan delta rejected, regenerating the plan: %s", e)
+        return {"modify_window": None}
+    logger.info(
+        "plan delta %s..%s: %d sessions rewritten",
+        window["start"],
+        window["end"],
+        len(resp.plan),
     )
 
-    resp = llm.invoke(input=[SystemMessage(content=sys), HumanMessage(content=hum)])
-    resp.additional_kwargs["visible"] = False
+    return {
+        "plan": plan,
+        "justification": resp.justification,
+        "modify_mode": "continue",
+        "modify_window": None,
+        # nothing was retrieved for a delta: the last run's sources don't apply
+        "rag_ctx": {**(state.get("rag_ctx") or {}), "sources": []},
+        "web_ctx": {**(state.get("web_ctx") or {}), "sources": []},
+    }
 
-    return {"messages": [resp], "start_route": "discuss"}
 
+def delta_node(state, llm):
+    resp = llm.invoke(_delta_messages(state))
 
-def load_node(state, llm):
+    return _delta_update(state, resp)
+
+
+async def adelta_node(state, llm):
+    resp = await llm.ainvoke(_delta_messages(state))
+
+    return _delta_update(state, resp)
+
+
+def _summary_update(state) -> Dict[str, Any]:
+    # rendered here rather than by the LLM: the table is out as soon as the
+    # plan is saved; with `summary_blurb` the justification comes from blurb
+    text = render_plan(
+        state.get("plan") or [],
+        None if settings.summary_blurb else state.get("justification"),
+        (state.get("rag_ctx") or {}).get("sources", []),
+        (state.get("web_ctx") or {}).get("sources", []),
+    )
+
+    return {
+        "messages": [AIMessage(content=text, additional_kwargs={"visible": True})],
+        "start_route": "discuss",
+    }
+
+
+def summary_node(state, llm):
+    return _summary_update(state)
+
+
+async def asummary_node(state, llm):
+    return _summary_update(state)
+
+
+def _blurb_messages(state) -> list:
+    sys = (
+        "You are an endurance coach. In 1–2 sentences, tell the athlete why their new "
+        "plan is built this way. Be warm and concrete, no list, no table."
+    )
+    plan = state.get("plan") or []
+    hum = f"SESSIONS: {len(plan)}\nJUSTIFICATION:\n{state.get('justification') or ''}"
+
+    return [SystemMessage(content=sys), HumanMessage(content=hum)]
+
+
+def blurb_node(state, llm):
+    resp = llm.invoke(_blurb_messages(state))
+
+    return {"messages": [resp]}
+
+
+async def ablurb_node(state, llm):
+    resp = await llm.ainvoke(_blurb_messages(state))
+
+    return {"messages": [resp]}
+
+
+def _load_update(result) -> Dict[str, Any]:
     try:
-        result = load_training_plan.invoke({})
+        if isinstance(result, Exception):
+            raise result
         data = json.loads(result)
 
         text = (
@@ -295,9 +609,28 @@ def load_node(state, llm):
     }
 
 
-def save_node(state, llm):
+def load_node(state, llm):
     try:
-        result = save_training_plan.invoke({"training_plan": state["plan"]})
+        result = load_training_plan.invoke({})
+    except Exception as e:
+        result = e
+
+    return _load_update(result)
+
+
+async def aload_node(state, llm):
+    try:
+        result = await load_training_plan.ainvoke({})
+    except Exception as e:
+        result = e
+
+    return _load_update(result)
+
+
+def _save_update(result) -> Dict[str, Any]:
+    try:
+        if isinstance(result, Exception):
+            raise result
         data = json.loads(result)
         text = (
             (
@@ -317,25 +650,78 @@ def save_node(state, llm):
     }
 
 
-def modify_node(state, llm):
+def save_node(state, llm):
+    try:
+        result = save_training_plan.invoke({"training_plan": state["plan"]})
+    except Exception as e:
+        result = e
+
+    return _save_update(result)
+
+
+async def asave_node(state, llm):
+    try:
+        result = await save_training_plan.ainvoke({"training_plan": state["plan"]})
+    except Exception as e:
+        result = e
+
+    return _save_update(result)
+
+
+def _modify_messages(state):
     sys = (
         "You are a strict router. Output ONLY the structured object.\n"
         "- 'modify' ONLY if the user EXPLICITLY asks to change the existing plan/schedule/sessions.\n"
         "- If the request is a general question, praise, or unrelated, return 'continue'."
     )
 
+    plan = state.get("plan") or []
+    if plan:
+        sys += (
+            f"\nToday is {datetime.today():%Y-%m-%d}. For 'modify', set start and end to the first and last date "
+            "of the sessions the change touches (e.g. the day a session moves from and the day it moves to); "
+            "leave them null if the whole plan must be redone.\n"
+            "======\n"
+            f"THE PLAN:\n{encode_plan(plan, settings.plan_encoding)}"
+        )
+
     last_usr_msg = ""
     for m in reversed(state["messages"]):
         if isinstance(m, HumanMessage):
             last_usr_msg = m.content
             break
 
-    resp = llm.invoke(
-        [SystemMessage(content=sys), HumanMessage(content=last_usr_msg)],
-        config={"temperature": 0, "max_tokens": 150},
-    )
+    return last_usr_msg, [
+        SystemMessage(content=sys),
+        HumanMessage(content=last_usr_msg),
+    ]
+
+
+def _modify_update(last_usr_msg: str, resp) -> Dict[str, Any]:
+    if resp.mode != "modify":
+        return {"modify_mode": resp.mode, "modify_window": None}
+
+    return {
+        "modify_mode": resp.mode,
+        "modify_query": [last_usr_msg],
+        "modify_window": _delta_window(
+            getattr(resp, "start", None), getattr(resp, "end", None)
+        ),
+    }
+
+
+def modify_node(state, llm):
+    last_usr_msg, msgs = _modify_messages(state)
+    resp = llm.invoke(msgs, config={"temperature": 0, "max_tokens": 150})
+
+    return _modify_update(last_usr_msg, resp)
+
+
+async def amodify_node(state, llm):
+    last_usr_msg, msgs = _modify_messages(state)
+    resp = await llm.ainvoke(msgs, config={"temperature": 0, "max_tokens": 150})
 
-    return {"modify_mode": resp.mode, "modify_query": [last_usr_msg]}
+    return _modify_update(last_usr_msg, resp)
 
 
 def save_confirm_node(state):
@@ -0,0 +1,186 @@
+import asyncio
+import concurrent.futures
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Coroutine, Dict, List, Optional
+
+from langgraph.config import get_config
+
+from my_coach.mcp.loop import get_loop
+from my_coach.mcp.garmin_store import afetch_activities
+from .utils import (
+    _garmin_window,
+    _get_fitness_summary,
+    _rag_context,
+    _rag_queries,
+)
+
+# specs needed before a retrieval is worth starting
+PREFETCH_FIELDS = ("sport", "goal")
+MAX_THREADS = 256
+
+_JOBS: "OrderedDict[str, Dict[str, _Job]]" = OrderedDict()
+_LOCK = threading.Lock()
+
+
+class _Job:
+    def __init__(self, key: str, future: concurrent.futures.Future):
+        self.key = key
+        self.future = future
+
+
+def _thread_id() -> Optional[str]:
+    try:
+        return get_config()["configurable"].get("thread_id")
+    except (RuntimeError, KeyError):
+        return None
+
+
+async def _fetch_garmin() -> str:
+    activities = await afetch_activities(**_garmin_window())
+    return _get_fitness_summary(activities)
+
+
+async def _fetch_rag(queries: List[str]) -> Dict[str, Any]:
+    return await asyncio.to_thread(_rag_context, queries, 4)
+
+
+def _query_key(queries: List[str]) -> str:
+    return "\n".join(queries)
+
+
+def _rag_key(state) -> str:
+    return _query_key(_rag_queries(state))
+
+
+def _garmin_key() -> str:
+    window = _garmin_window()
+    return f"{window['from_date']}:{window['to_date']}"
+
+
+def _stored_key(state, kind: str) -> Optional[str]:
+    return ((state.get("prefetch") or {}).get(kind) or {}).get("key")
+
+
+def _submit(
+    thread_id: str,
+    kind: str,
+    key: str,
+    make: Callable[[], Coroutine[Any, Any, Any]],
+    stored_key: Optional[str] = None,
+) -> None:
+    with _LOCK:
+        jobs = _JOBS.setdefault(thread_id, {})
+        _JOBS.move_to_end(thread_id)
+        while len(_JOBS) > MAX_THREADS:
+            _, evicted = _JOBS.popitem(last=False)
+            for job in evicted.values():
+                job.future.cancel()
+
+        job = jobs.get(kind)
+        if job is not None:
+            if job.key == key and not job.future.cancelled():
+                return
+            # answers changed since this job started
+            job.future.cancel()
+            del jobs[kind]
+        if key == stored_key:
+            # already harvested into the state (e.g. before a restart)
+            return
+
+        future = asyncio.run_coroutine_threadsafe(make(), get_loop())
+        jobs[kind] = _Job(key, future)
+
+
+def schedule(state, specs: Dict[str, Any]) -> None:
+    """Start Garmin and RAG work for the answers collected so far.
+
+    Called after every questionnaire turn. Jobs are keyed on their query text
+    (the Garmin window, the RAG queries), so only an answer that changes the
+    queries cancels and replaces a retrieval; other answers leave it running.
+    """
+    thread_id = _thread_id()
+    if thread_id is None or not all(specs.get(f) for f in PREFETCH_FIELDS):
+        return
+
+    if state.get("garmin_consent"):
+        _submit(
+            thread_id,
+            "garmin_data",
+            _garmin_key(),
+            _fetch_garmin,
+            _stored_key(state, "garmin_data"),
+        )
+
+    queries = _rag_queries({**state, "specs": specs})
+    _submit(
+        thread_id,
+        "rag_ctx",
+        _query_key(queries),
+        lambda: _fetch_rag(queries),
+        _stored_key(state, "rag_ctx"),
+    )
+
+
+def harvest(state) -> Dict[str, Any]:
+    """Finished prefetch results, in the shape stored under state["prefetch"]."""
+    stored = dict(state.get("prefetch") or {})
+    thread_id = _thread_id()
+    if thread_id is None:
+        return stored
+
+    with _LOCK:
+        jobs = dict(_JOBS.get(thread_id, {}))
+
+    for kind, job in jobs.items():
+        fut = job.future
+        if fut.done() and not fut.cancelled() and fut.exception() is None:
+            stored[kind] = {"key": job.key, "value": fut.result()}
+
+    return stored
+
+
+def lookup(state, kind: str) -> Optional[concurrent.futures.Future]:
+    """Prefetched (or still running) result of `kind` for the current state."""
+    key = _garmin_key() if kind == "garmin_data" else _rag_key(state)
+
+    stored = (state.get("prefetch") or {}).get(kind)
+    if stored and stored.get("key") == key:
+        done: concurrent.futures.Future = concurrent.futures.Future()
+        done.set_result(stored["value"])
+        return done
+
+    thread_id = _thread_id()
+    if thread_id is None:
+        return None
+
+    with _LOCK:
+        job = _JOBS.get(thread_id, {}).get(kind)
+    if job is None or job.key != key or job.future.cancelled():
+        return None
+    return job.future
+
+
+def result(future: Optional[concurrent.futures.Future]) -> Optional[Any]:
+    if future is None:
+        return None
+    try:
+        return future.result()
+    except (Exception, concurrent.futures.CancelledError):
+        return None
+
+
+async def aresult(future: Optional[concurrent.futures.Future]) -> Optional[Any]:
+    if future is None:
+        return None
+    job = asyncio.wrap_future(future)
+    try:
+        # shield: a cancelled node must not cancel a job another turn may reuse
+        return await asyncio.shield(job)
+    except asyncio.CancelledError:
+        # the job itself was cancelled (answers changed); otherwise we were
+        if job.cancelled():
+            return None
+        raise
+    except Exception:
+        return None
@@ -0,0 +1,47 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+from my_coach.llm.plan_format import sessions
+
+
+def _cell(text: str) -> str:
+    return text.replace("|", "\\|")
+
+
+def plan_table(plan: Sequence[Any]) -> str:
+    """The plan as a markdown table, one row per session in date order."""
+    rows = ["| Date | Day | Session |", "|---|---|---|"]
+    rows += [
+        f"| {day.strftime('%d-%m-%Y')} | {day.strftime('%a')} | {_cell(text)} |"
+        for day, text in sessions(plan)
+    ]
+    return "\n".join(rows)
+
+
+def sources_list(
+    rag_sources: Sequence[Dict[str, Any]], web_sources: Sequence[Dict[str, Any]]
+) -> str:
+    """Markdown list of the local evidence (by its [i]) and the web results."""
+    lines = []
+    for s in rag_sources:
+        page = f", p. {s['page']}" if s.get("page") is not None else ""
+        lines.append(f"- [{s.get('id')}] {s.get('title')}{page}")
+    for s in web_sources:
+        title = s.get("title") or s.get("url")
+        lines.append(f"- [{title}]({s['url']})" if s.get("url") else f"- {title}")
+    return "\n".join(lines)
+
+
+def render_plan(
+    plan: Sequence[Any],
+    justification: Optional[str],
+    rag_sources: Sequence[Dict[str, Any]] = (),
+    web_sources: Sequence[Dict[str, Any]] = (),
+) -> str:
+    """The plan table, the justification and a Sources list, in markdown."""
+    parts: List[str] = [plan_table(plan) if plan else "_The plan is empty._"]
+    if justification:
+        parts.append(justification.strip())
+    sources = sources_list(rag_sources, web_sources)
+    if sources:
+        parts.append("**Sources**\n" + sources)
+    return "\n\n".join(parts)
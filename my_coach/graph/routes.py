@@ -1,4 +1,5 @@
-from .nodes import QUESTIONNAIRE
+from my_coach.config import settings
+from .nodes import questionnaire_fields
 
 
 def route_start(state):
@@ -15,26 +16,42 @@ def route_start(state):
 
 
 def route_after_question(state):
-    if state["question_idx"] >= len(QUESTIONNAIRE):
+    fields = questionnaire_fields(state.get("garmin_consent"))
+    if state["question_idx"] > len(fields):
         return "coach"
     return "continue"
 
 
-def route_garmin(state):
-    gar = state.get("garmin_consent")
-    tav = state.get("search")
+def route_context(state):
+    branches = ["retriever"]
+
+    if state.get("garmin_consent"):
+        branches.append("garmin")
+    if state.get("search"):
+        branches.append("search")
+
+    return branches
+
+
+def route_delta(state):
+    # a rejected delta leaves modify_mode at "modify"
+    mode = state.get("modify_mode", "continue")
+    return "save" if mode == "continue" else "modify"
 
-    if not gar and not tav:
-        return "coach"
 
-    return "search" if not gar else "garmin"
+def route_summary(state):
+    branches = ["summary"]
 
+    if settings.summary_blurb:
+        branches.append("blurb")
 
-def route_tavily(state):
-    tav = state.get("search")
-    return "coach" if not tav else "search"
+    return branches
 
 
 def route_modify(state):
     mode = state.get("modify_mode", "continue")
-    return "continue" if mode == "continue" else "modify"
+    if mode == "continue":
+        return "continue"
+    if settings.plan_delta and state.get("plan") and state.get("modify_window"):
+        return "delta"
+    return "modify"
@@ -1,14 +1,62 @@
 from typing import TypedDict, Annotated, Optional, List, Dict, Any, Literal
+from langchain_core.messages import BaseMessage, HumanMessage, RemoveMessage
 from langgraph.graph import add_messages
 from langgraph.channels import LastValue
 from functools import partial
 
+from my_coach.config import settings
+from my_coach.llm.tokens import count_tokens
 
-def add_and_trim(prev: list, new: list, k: int):
-    return add_messages(prev, new)
 
+def message_tokens(message: BaseMessage) -> int:
+    content = message.content
+    if not isinstance(content, str):
+        # content blocks: only the text ones reach the prompt as tokens
+        content = " ".join(
+            b if isinstance(b, str) else str(b.get("text", "")) for b in content
+        )
+    # role and separators, roughly
+    return count_tokens(content) + 4
 
-add_and_trim8 = partial(add_and_trim, k=8)
+
+def tail_start(messages: List[BaseMessage], max_tokens: int, k: int = 2) -> int:
+    """Index where the newest `max_tokens` worth of `messages` starts.
+
+    The last `k` messages are kept whatever their size. The cut moves forward
+    to the next user message, so the tail never opens on an answer whose
+    question was dropped.
+    """
+    used, start = 0, len(messages)
+    for i in range(len(messages) - 1, -1, -1):
+        used += message_tokens(messages[i])
+        if used > max_tokens and i < len(messages) - k:
+            break
+        start = i
+    if start == 0:
+        return 0
+    for i in range(start, len(messages) - k + 1):
+        if isinstance(messages[i], HumanMessage):
+            return i
+    return start
+
+
+def add_and_trim(prev: list, new: list, k: int, max_tokens: int):
+    """add_messages, then only the newest `max_tokens` of history (see tail_start).
+
+    Nodes fold old turns into `history_summary` and remove them well before
+    this bound; it only caps the history when that did not happen.
+    """
+    if not isinstance(new, list):
+        new = [new]
+    # removals of messages this bound already dropped
+    known = {m.id for m in prev}
+    new = [m for m in new if not (isinstance(m, RemoveMessage) and m.id not in known)]
+
+    messages = add_messages(prev, new)
+    return messages[tail_start(messages, max_tokens, k) :]
+
+
+add_and_trim8 = partial(add_and_trim, k=8, max_tokens=settings.history_max_tokens)
 
 
 class State(TypedDict):
@@ -21,8 +69,11 @@ class State(TypedDict):
     rag_ctx: Optional[Dict[str, Any]]
     rag_bib: Optional[List[Dict[str, Any]]]
     garmin_data: Optional[str]
+    prefetch: Optional[Dict[str, Any]]
 
     messages: Annotated[list, add_and_trim8]
+    # rolling summary of the turns folded out of `messages`
+    history_summary: Optional[str]
     plan: Optional[List]
     justification: Optional[str]
     specs: Dict[str, Any]
@@ -30,3 +81,5 @@ class State(TypedDict):
     welcome: Optional[bool]
     mode: Literal["make", "discuss"]
     modify_query: Annotated[Optional[List[str]], add_messages]
+    # {"start", "end"} dates the latest modify request touches, if known
+    modify_window: Optional[Dict[str, Any]]
@@ -0,0 +1,209 @@
+import threading
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+CTL_DAYS = 42  # chronic load (fitness) time constant
+ATL_DAYS = 7  # acute load (fatigue) time constant
+ACUTE_WINDOW = 7
+CHRONIC_WINDOW = 28
+
+COLUMNS = ["load", "ctl", "atl", "tsb", "acwr", "monotony", "strain", "ramp"]
+
+
+def daily_load(
+    activity_list: List[Dict[str, Any]], until: Optional[date] = None
+) -> pd.Series:
+    """Training stress per calendar day, zero-filled from the first day to `until`.
+
+    Uses Garmin's TSS when present, then its training load, then an estimate
+    from duration and intensity factor (hours * IF^2 * 100, IF 0.7 if unknown).
+    """
+    if not activity_list:
+        return pd.Series(dtype=float, name="load")
+
+    df = pd.DataFrame(activity_list)
+    day = pd.to_datetime(
+        df.get("startTimeLocal", pd.Series(index=df.index, dtype=object)),
+        errors="coerce",
+    ).dt.normalize()
+
+    def col(name: str) -> pd.Series:
+        if name not in df:
+            return pd.Series(np.nan, index=df.index)
+        return pd.to_numeric(df[name], errors="coerce")
+
+    hours = col("duration") / 3600.0
+    intensity = col("intensityFactor").fillna(0.7)
+    load = (
+        col("trainingStressScore")
+        .fillna(col("activityTrainingLoad"))
+        .fillna(hours * intensity**2 * 100.0)
+        .fillna(0.0)
+    )
+
+    per_day = load[day.notna()].groupby(day[day.notna()]).sum()
+    if per_day.empty:
+        return pd.Series(dtype=float, name="load")
+
+    # rest days up to `until` still decay fitness and fatigue
+    end = max(per_day.index[-1], pd.Timestamp(until)) if until else per_day.index[-1]
+    days = pd.date_range(per_day.index[0], end, freq="D")
+    return per_day.reindex(days, fill_value=0.0).rename("load")
+
+
+def _ewm(values: np.ndarray, days: int, seed: float) -> np.ndarray:
+    # x_t = x_{t-1} + (load_t - x_{t-1}) / days, started from `seed`
+    seeded = pd.Series(np.concatenate(([seed], values)))
+    return seeded.ewm(alpha=1.0 / days, adjust=False).mean().to_numpy()[1:]
+
+
+def _rolling(values: np.ndarray, window: int, warmup: int):
+    """Mean, sample std and sum over the trailing `window` days, from `warmup` on."""
+    padded = np.concatenate((np.full(window - 1, np.nan), values))
+    windows = np.lib.stride_tricks.sliding_window_view(padded, window)[warmup:]
+    count = np.sum(~np.isnan(windows), axis=1)
+    total = np.nansum(windows, axis=1)
+    mean = total / count
+    sq = np.nansum((windows - mean[:, None]) ** 2, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        std = np.where(count >= 2, np.sqrt(sq / (count - 1)), np.nan)
+    return mean, std, total
+
+
+def compute(
+    loads: pd.Series, seed: Optional[pd.Series] = None, warmup: int = 0
+) -> pd.DataFrame:
+    """Metrics for every day of `loads`.
+
+    `seed` is the metrics row of the day before `loads[warmup]`; the first
+    `warmup` days only feed the rolling windows and are not returned.
+    """
+    ctl_seed = float(seed["ctl"]) if seed is not None else 0.0
+    atl_seed = float(seed["atl"]) if seed is not None else 0.0
+
+    values = loads.to_numpy(dtype=float)
+    fresh = values[warmup:]
+    ctl = _ewm(fresh, CTL_DAYS, ctl_seed)
+    atl = _ewm(fresh, ATL_DAYS, atl_seed)
+    # form is yesterday's fitness minus yesterday's fatigue
+    tsb = np.concatenate(([ctl_seed - atl_seed], (ctl - atl)[:-1]))
+
+    acute, week_std, week_sum = _rolling(values, ACUTE_WINDOW, warmup)
+    chronic = _rolling(values, CHRONIC_WINDOW, warmup)[0]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        acwr = np.where(chronic > 0, acute / chronic, np.nan)
+        monotony = np.where(week_std > 0, acute / week_std, np.nan)
+
+    ramp = np.full(len(ctl), np.nan)
+    ramp[ACUTE_WINDOW:] = ctl[ACUTE_WINDOW:] - ctl[:-ACUTE_WINDOW]
+
+    return pd.DataFrame(
+        {
+            "load": fresh,
+            "ctl": ctl,
+            "atl": atl,
+            "tsb": tsb,
+            "acwr": acwr,
+            "monotony": monotony,
+            "strain": week_sum * monotony,
+            "ramp": ramp,
+        },
+        index=loads.index[warmup:],
+        columns=COLUMNS,
+    )
+
+
+class TrainingLoadModel:
+    """Daily training-load metrics that only recompute from the first changed day.
+
+    `update` takes the daily loads of any window (e.g. the last fetch); days in
+    it replace the stored ones, everything before the first change is kept.
+    """
+
+    def __init__(self):
+        self.frame = pd.DataFrame(columns=COLUMNS, dtype=float)
+        self._lock = threading.Lock()
+
+    def update(self, loads: pd.Series) -> pd.DataFrame:
+        with self._lock:
+            if loads.empty:
+                return self.frame
+            if self.frame.empty:
+                self.frame = compute(loads.asfreq("D", fill_value=0.0))
+                return self.frame
+
+            frame = self.frame
+            loads = loads.asfreq("D", fill_value=0.0)
+            same = np.isclose(loads, frame["load"].reindex(loads.index))
+            if same.all():
+                return frame
+            start = loads.index[~same][0]
+
+            kept = frame.loc[frame.index < start]
+            # days between the stored end and the new window are rest days
+            end = max(loads.index[-1], frame.index[-1])
+            first = max(
+                start - pd.Timedelta(days=CHRONIC_WINDOW - 1),
+                min(frame.index[0], loads.index[0]),
+            )
+            days = pd.date_range(first, end)
+            stored = frame["load"].reindex(days).to_numpy()
+            new = loads.reindex(days).to_numpy()
+            tail = pd.Series(
+                np.nan_to_num(np.where(np.isnan(new), stored, new)), index=days
+            )
+            warmup = int((tail.index < start).sum())
+
+            fresh = compute(
+                tail, seed=kept.iloc[-1] if len(kept) else None, warmup=warmup
+            )
+            # the week-on-week ramp of the first new days reaches into kept rows
+            ctl = np.concatenate(
+                (kept["ctl"].to_numpy()[-ACUTE_WINDOW:], fresh["ctl"].to_numpy())
+            )
+            ramp = ctl[ACUTE_WINDOW:] - ctl[:-ACUTE_WINDOW]
+            fresh["ramp"] = np.concatenate(
+                (np.full(len(fresh) - len(ramp), np.nan), ramp)
+            )[-len(fresh) :]
+
+            self.frame = pd.concat([kept, fresh]) if len(kept) else fresh
+            return self.frame
+
+    def summary(self, weeks: int = 4) -> Dict[str, Any]:
+        frame = self.frame
+        if frame.empty:
+            return {}
+
+        def num(v, nd=2):
+            return None if pd.isna(v) else round(float(v), nd)
+
+        last = frame.iloc[-1]
+        weekly = (
+            frame[["load", "ctl"]]
+            .resample("W-SUN")
+            .agg({"load": "sum", "ctl": "last"})
+            .tail(weeks + 1)
+        )
+        weekly["ramp"] = weekly["ctl"].diff()
+
+        return {
+            "as_of": frame.index[-1].strftime("%Y-%m-%d"),
+            "chronic_load_ctl": num(last["ctl"], 1),
+            "acute_load_atl": num(last["atl"], 1),
+            "training_stress_balance_tsb": num(last["tsb"], 1),
+            "acute_chronic_ratio": num(last["acwr"]),
+            "monotony_7d": num(last["monotony"]),
+            "strain_7d": num(last["strain"], 0),
+            "ctl_ramp_7d": num(last["ramp"], 1),
+            "weekly": [
+                {
+                    "week_ending": idx.strftime("%Y-%m-%d"),
+                    "load": num(row["load"], 0),
+                    "ctl_ramp": num(row["ramp"], 1),
+                }
+                for idx, row in weekly.tail(weeks).iterrows()
+            ],
+        }
@@ -1,37 +1,134 @@
 import pandas as pd
 import numpy as np
 import json
+import logging
 import pathlib
-from typing import Dict, Any, List, Tuple
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
 
 
-from langchain_community.vectorstores import FAISS
 from langchain_mistralai import MistralAIEmbeddings
 from langchain.schema import Document
 
+from my_coach.config import settings
+from my_coach.domain.shemas import TrainingItem
+from my_coach.llm.plan_format import sessions
+from my_coach.rag.cache import TTLCache
+from my_coach.rag.compress import compress_context
+from my_coach.rag.dedup import DedupStats, drop_near_duplicates
+from my_coach.rag.router import ShardRouter, ShardedRetriever, load_router
+from my_coach.rag.embeddings import cached
+from .training_load import TrainingLoadModel, daily_load
+
+logger = logging.getLogger(__name__)
+
 _INDEX_DIR = pathlib.Path(__file__).resolve().parents[2] / "data" / "index_faiss"
 _INDEX = None
-_RETRIEVER = None
+_RETRIEVERS: Dict[Tuple[int, int, str], ShardedRetriever] = {}
+_RETRIEVER_LOCK = threading.Lock()
+_RETRIEVE_CACHE = TTLCache(
+    settings.retrieval_cache_size, settings.retrieval_cache_ttl_s
+)
+# near-duplicate chunks kept out of the RAG context since startup
+_DEDUP_STATS = DedupStats()
+# one Garth account per process: keep its load history across calls
+_LOAD_MODEL = TrainingLoadModel()
 
 
-def _get_retriever(k: int = 4):
-    global _INDEX, _RETRIEVER
-    if _RETRIEVER is None:
-        emb = MistralAIEmbeddings(model="mistral-embed")
-        _INDEX = FAISS.load_local(
-            str(_INDEX_DIR), emb, allow_dangerous_deserialization=True
-        )
-        _RETRIEVER = _INDEX.as_retriever(
-            search_kwargs={"k": k, "fetch_k": 20}, search_type="mmr"
-        )
-    return _RETRIEVER
+def _get_index() -> ShardRouter:
+    global _INDEX
+    with _RETRIEVER_LOCK:
+        if _INDEX is None:
+            emb = cached(MistralAIEmbeddings(model="mistral-embed"))
+            _INDEX = load_router(_INDEX_DIR, emb)
+        return _INDEX
+
+
+def _get_retriever(k: int = 4, fetch_k: int = 20, search_type: str = "mmr"):
+    key = (k, fetch_k, search_type)
+    retriever = _RETRIEVERS.get(key)
+    if retriever is None:
+        router = _get_index()
+        with _RETRIEVER_LOCK:
+            retriever = _RETRIEVERS.setdefault(
+                key,
+                ShardedRetriever(
+                    router=router, k=k, fetch_k=fetch_k, search_type=search_type
+                ),
+            )
+    return retriever
+
+
+def warm_up(query: str = "endurance training periodization") -> None:
+    """Load the index and run one retrieval, logging how long each step takes."""
+    t0 = time.perf_counter()
+    router = _get_index()
+    t1 = time.perf_counter()
+    logger.info(
+        "FAISS index loaded in %.2fs (%d chunks in %d shards)",
+        t1 - t0,
+        router.ntotal,
+        len(router.shards),
+    )
+
+    # builds the retriever retrieval uses (k is doubled under near_dup) and
+    # embeds through the HTTP client once, so its connection pool is open too;
+    # _search rather than _retrieve_many, so the probe stays out of the cache
+    _search([query], 4, 20, "mmr")
+    t2 = time.perf_counter()
+    logger.info("warm-up retrieval in %.2fs", t2 - t1)
+
 
+def start_warm_up() -> threading.Thread:
+    """Run `warm_up` in a daemon thread, so startup does not wait for the index."""
 
-def _retrieve(
-    query: str, k: int = 4
+    def run():
+        try:
+            warm_up()
+        except Exception:
+            # retrieval will retry the load lazily on first use
+            logger.exception("index warm-up failed")
+
+    thread = threading.Thread(target=run, name="index-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def _retrieve_many(
+    queries: List[str], k: int = 4, fetch_k: int = 20, search_type: str = "mmr"
+) -> Tuple[List[Document], List[Dict[str, Any]], str]:
+    key = (tuple(_normalize_query(q) for q in queries), k, fetch_k, search_type)
+    docs, bib, ctx = _RETRIEVE_CACHE.get_or_compute(
+        key,
+        lambda: _search(queries, k, fetch_k, search_type),
+        # a lexical-only fallback is not cached: the next call may get vectors
+        keep=lambda result: all(
+            d.metadata.get("retrieval") != "lexical" for d in result[0]
+        ),
+    )
+    # callers may keep and edit the bibliography: hand out copies
+    return list(docs), [dict(b) for b in bib], ctx
+
+
+def _search(
+    queries: List[str], k: int, fetch_k: int, search_type: str
 ) -> Tuple[List[Document], List[Dict[str, Any]], str]:
-    retriever = _get_retriever(k)
-    docs: List[Document] = retriever.invoke(query)
+    # twice the candidates, so k are left once near-duplicates are dropped
+    n = 2 * k if settings.near_dup else k
+    docs: List[Document] = _get_retriever(n, fetch_k, search_type).search_many(queries)
+    if settings.near_dup:
+        docs, dropped = drop_near_duplicates(docs, settings.near_dup_jaccard)
+        if dropped.chunks:
+            with _RETRIEVER_LOCK:
+                _DEDUP_STATS.merge(dropped)
+            logger.info("retrieval dropped %s; since startup: %s", dropped, _DEDUP_STATS)
+    docs = docs[:k]
     bib, ctx = [], []
 
     for i, d in enumerate(docs, start=1):
@@ -50,6 +147,20 @@ def _retrieve(
     return docs, bib, "\n\n".join(ctx)
 
 
+def _rag_context(queries: List[str], k: int = 4) -> Dict[str, Any]:
+    """Evidence for the coach, as stored under state["rag_ctx"]."""
+    docs, bib, ctx = _retrieve_many(queries, k)
+    if settings.rag_compress and docs:
+        scorer = settings.rag_compress_scorer == "embeddings"
+        ctx = compress_context(
+            [d.page_content for d in docs],
+            " ".join(queries),
+            settings.rag_context_tokens,
+            _get_index().embeddings if scorer else None,
+        )
+    return {"brief": ctx, "sources": bib}
+
+
 def _build_query(specs: Dict[str, str]) -> str:
     sport = specs.get("sport", "endurance sports")
     goal = specs.get("goal", "build_base")
@@ -62,13 +173,90 @@ def _build_query(specs: Dict[str, str]) -> str:
     )
 
 
-def _get_fitness_summary(snapshot: Dict[str, Any]) -> str:
-    if not snapshot.get("result"):
-        return json.dumps({"status": "No data found"})
+# questionnaire answers that mean "nothing to add"
+_NO_ANSWER = {"", "-", "no", "none", "n/a", "na", "nothing", "nope"}
 
-    activity_list = snapshot["result"]["SnapshotFitnessDetails"]["payload"][
-        "activityList"
+
+def _answer(value: Any) -> Optional[str]:
+    text = " ".join(str(value or "").split())
+    return None if text.lower().strip(".!") in _NO_ANSWER else text
+
+
+def _latest_request(modify_query: Any) -> Optional[str]:
+    # a list of messages under the add_messages reducer, or plain text
+    if isinstance(modify_query, list):
+        modify_query = modify_query[-1] if modify_query else None
+    return _answer(getattr(modify_query, "content", modify_query))
+
+
+def _rag_queries(state) -> List[str]:
+    """Short retrieval queries, one per concern, instead of one long query.
+
+    Goal, constraints (injuries, travel, terrain), free remarks and the latest
+    modification request each get their own query, prefixed with the sport.
+    Garmin numbers are left out: they do not match any text in the corpus.
+    """
+    specs = state.get("specs", {}) or {}
+    sport = _answer(specs.get("sport")) or "endurance"
+    goal = _answer(specs.get("goal")) or "building an aerobic base"
+
+    queries = [f"{sport} training for {goal}"]
+    constraints = _answer(specs.get("constraints"))
+    if constraints:
+        queries.append(f"{sport} training with {constraints}")
+    remarks = _answer(specs.get("additional_remarks"))
+    if remarks:
+        queries.append(f"{sport}: {remarks}")
+    request = _latest_request(state.get("modify_query"))
+    if request:
+        queries.append(f"{sport} training plan change: {request}")
+
+    return list(dict.fromkeys(queries))
+
+
+def _delta_window(
+    start: Optional[date], end: Optional[date]
+) -> Optional[Dict[str, date]]:
+    """{"start", "end"} of a modify request, if narrow enough to rewrite alone."""
+    if start is None or end is None:
+        return None
+    start, end = min(start, end), max(start, end)
+    if (end - start).days + 1 > settings.plan_delta_max_days:
+        return None
+    return {"start": start, "end": end}
+
+
+def _replace_window(
+    plan: List[Any], items: List[TrainingItem], start: date, end: date
+) -> List[TrainingItem]:
+    """`plan` with its sessions from `start` to `end` replaced by `items`.
+
+    Raises ValueError if an item is dated outside the window: the window
+    was too narrow for the change (a session moved past its end, say), and
+    neither dropping the item nor widening over sessions the delta never saw
+    would be right.
+    """
+    outside = [item.Date for item in items if not start <= item.Date <= end]
+    if outside:
+        raise ValueError(f"sessions outside {start}..{end}: {outside}")
+    kept = [
+        TrainingItem(Date=d, Description=text)
+        for d, text in sessions(plan)
+        if not start <= d <= end
     ]
+    return sorted(kept + list(items), key=lambda item: item.Date)
+
+
+def _garmin_window() -> Dict[str, date]:
+    end = datetime.today().date()
+    start = end - timedelta(days=settings.garmin_lookback_days)
+    return {"from_date": start, "to_date": end}
+
+
+def _get_fitness_summary(
+    activity_list: List[Dict[str, Any]],
+    load_model: Optional[TrainingLoadModel] = None,
+) -> str:
     if not activity_list:
         return json.dumps({"status": "No activities"})
 
@@ -105,7 +293,9 @@ def _get_fitness_summary(snapshot: Dict[str, Any]) -> str:
     # derived
     df["distance_km"] = (df["distance"] / 1000.0) if "distance" in df else np.nan
     df["minutes"] = (df["duration"] / 60.0) if "duration" in df else np.nan
-    df["speed_kmh"] = df["distance_km"] / (df["minutes"] / 60.0)
+    df["speed_kmh"] = (df["distance_km"] / (df["minutes"] / 60.0)).replace(
+        [np.inf, -np.inf], np.nan
+    )
 
     if df["start_dt"].notna().any():
         min_dt, max_dt = df["start_dt"].min(), df["start_dt"].max()
@@ -147,53 +337,44 @@ def _get_fitness_summary(snapshot: Dict[str, Any]) -> str:
             )
             if totals.get("total_training_stress_score")
             else None,
-            "trainingLoad_per_week": round(totals["total_trainingLoad"] / weeks, 1)
-            if totals.get("total_trainingLoad")
+            "trainingLoad_per_week": round(totals["total_training_load"] / weeks, 1)
+            if totals.get("total_training_load")
             else None,
         }
     else:
         per_week = {}
 
-    # per-sport (session averages)
+    # per-sport (session averages), one grouped pass
     per_sport = {}
+    primary_sport = None
     if "activityType" in df:
-        for sport, g in df.groupby("activityType"):
+        metrics = {
+            "avg_distance_km": ("distance_km", 2),
+            "avg_session_min": ("minutes", 1),
+            "avg_speed_kmh": ("speed_kmh", 2),
+            "avg_intensity_factor": ("intensityFactor", 3),
+            "avg_training_stress_score": ("trainingStressScore", 1),
+            "avg_training_load": ("activityTrainingLoad", 1),
+        }
+        grouped = df.groupby("activityType")
+        means = grouped[[c for c, _ in metrics.values() if c in df]].mean()
+        sessions = grouped.size()
+        dist_by = grouped["distance_km"].sum(min_count=1).fillna(0.0)
+
+        for sport, row in means.iterrows():
             per_sport[sport] = {
-                "avg_distance_km": round(float(np.nanmean(g["distance_km"])), 2)
-                if g["distance_km"].notna().any()
-                else None,
-                "avg_session_min": round(float(np.nanmean(g["minutes"])), 1)
-                if g["minutes"].notna().any()
-                else None,
-                "avg_speed_kmh": round(float(np.nanmean(g["speed_kmh"])), 2)
-                if g["speed_kmh"].notna().any()
-                else None,
-                "avg_intensity_factor": round(
-                    float(np.nanmean(g["intensityFactor"])), 3
-                )
-                if "intensityFactor" in g and g["intensityFactor"].notna().any()
-                else None,
-                "avg_training_stress_score": round(
-                    float(np.nanmean(g["trainingStressScore"])), 1
-                )
-                if "trainingStressScore" in g and g["trainingStressScore"].notna().any()
-                else None,
-                "avg_training_load": round(
-                    float(np.nanmean(g["activityTrainingLoad"])), 1
-                )
-                if "activityTrainingLoad" in g
-                and g["activityTrainingLoad"].notna().any()
-                else None,
-                "sessions": int(len(g)),
+                key: round(float(row[c]), nd) if pd.notna(row.get(c)) else None
+                for key, (c, nd) in metrics.items()
             }
+            per_sport[sport]["sessions"] = int(sessions[sport])
 
-    # primary sport & focus cue
-    if "activityType" in df:
-        dist_by = df.groupby("activityType")["distance_km"].sum(min_count=1).fillna(0.0)
-        freq_by = df.groupby("activityType").size()
-        primary_sport = dist_by.idxmax() if dist_by.max() > 0 else freq_by.idxmax()
-    else:
-        primary_sport = None
+        # primary sport & focus cue
+        primary_sport = (
+            dist_by.idxmax() if dist_by.max() > 0 else sessions.idxmax()
+        )
+
+    load_model = load_model or _LOAD_MODEL
+    load_model.update(daily_load(activity_list, until=datetime.today().date()))
 
     summary = {
         "status": "ok",
@@ -201,6 +382,7 @@ def _get_fitness_summary(snapshot: Dict[str, Any]) -> str:
         "per_week": per_week,
         "per_sport": per_sport,
         "primary_sport": primary_sport,
+        "training_load": load_model.summary(),
     }
 
     return json.dumps(summary)
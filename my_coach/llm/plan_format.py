@@ -0,0 +1,57 @@
+from datetime import date
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from my_coach.domain.shemas import TrainingItem
+
+Session = Tuple[date, str]
+
+
+def sessions(plan: Sequence[Any]) -> List[Session]:
+    """(date, description) of each session, in date order.
+
+    Takes TrainingItems from the coach as well as the {"Date": "DD-MM-YYYY",
+    "Description": ...} rows of a loaded plan.
+    """
+    out = []
+    for item in plan:
+        if not isinstance(item, TrainingItem):
+            item = TrainingItem.model_validate(item)
+        out.append((item.Date, " ".join(item.Description.split())))
+    return sorted(out, key=lambda s: s[0])
+
+
+def encode_rows(plan: Sequence[Any]) -> str:
+    """One line per session: ISO date, weekday, description.
+
+    2025-08-12 Tue 10 km easy + strides
+    """
+    return "\n".join(f"{d.isoformat()} {d:%a} {text}" for d, text in sessions(plan))
+
+
+def encode_weeks(plan: Sequence[Any]) -> str:
+    """Sessions grouped under the Monday of their week, by weekday.
+
+    week 2025-08-11
+    Tue 10 km easy + strides
+    """
+    lines, week = [], None
+    for d, text in sessions(plan):
+        monday = date.fromordinal(d.toordinal() - d.weekday())
+        if monday != week:
+            week = monday
+            lines.append(f"week {monday.isoformat()}")
+        lines.append(f"{d:%a} {text}")
+    return "\n".join(lines)
+
+
+ENCODINGS: Dict[str, Callable[[Sequence[Any]], str]] = {
+    "rows": encode_rows,
+    "weeks": encode_weeks,
+}
+
+
+def encode_plan(plan: Sequence[Any], encoding: str = "rows") -> str:
+    """The plan as prompt text; see ENCODINGS and scripts/bench_plan_format.py."""
+    if not plan:
+        return "No plan yet."
+    return ENCODINGS[encoding](plan)
@@ -0,0 +1,93 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .tokens import count_tokens, truncate_tokens
+
+ELLIPSIS = " …"
+
+
+@dataclass
+class Section:
+    """One `--- TITLE ---` block of a prompt.
+
+    Lower `priority` is more important. Packing first trims the sections that
+    have a `min_tokens` down to it, least important first; only if that is
+    not enough are all sections trimmed further, in the same order. An empty
+    section renders `placeholder`, or is left out when that is empty too.
+    """
+
+    title: str
+    text: str
+    priority: int
+    min_tokens: Optional[int] = None
+    placeholder: str = ""
+
+    def render(self, text: str) -> str:
+        return f"--- {self.title} ---\n{text}"
+
+
+@dataclass
+class PackStats:
+    budget: int
+    tokens: int = 0
+    # title -> (tokens wanted, tokens packed)
+    sections: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+
+    @property
+    def trimmed(self) -> List[str]:
+        return [t for t, (want, got) in self.sections.items() if got < want]
+
+    def __str__(self) -> str:
+        parts = ", ".join(
+            f"{t} {got}" + (f"/{want}" if got < want else "")
+            for t, (want, got) in self.sections.items()
+        )
+        return f"{self.tokens}/{self.budget} tokens ({parts})"
+
+
+def _shrink(text: str, target: int) -> str:
+    # `text` cut short, with ELLIPSIS, in at most `target` tokens
+    limit = target - count_tokens(ELLIPSIS)
+    while limit > 0:
+        body = truncate_tokens(text, limit) + ELLIPSIS
+        excess = count_tokens(body) - target
+        if excess <= 0:
+            return body
+        limit -= excess
+    return ""
+
+
+def pack_prompt(sections: Sequence[Section], budget: int) -> Tuple[str, PackStats]:
+    """Render `sections` in order within `budget` tokens, trimming by priority."""
+    texts = [s.text.strip() or s.placeholder for s in sections]
+    want = [count_tokens(s.render(t)) if t else 0 for s, t in zip(sections, texts)]
+    got = list(want)
+    # joined with "\n": one token per boundary, give or take
+    over = sum(got) + len(sections) - budget
+
+    order = sorted(range(len(sections)), key=lambda i: -sections[i].priority)
+    for floor_pass in (True, False):
+        for i in order:
+            if over <= 0:
+                break
+            s = sections[i]
+            head = count_tokens(s.render(""))
+            body = got[i] - head
+            floor = s.min_tokens if floor_pass else 0
+            if not got[i] or floor is None or body <= floor:
+                continue
+            texts[i] = _shrink(texts[i], max(floor, body - over))
+            new = count_tokens(s.render(texts[i])) if texts[i] else 0
+            over -= got[i] - new
+            got[i] = new
+
+    stats = PackStats(budget)
+    rendered = []
+    for s, text, w, g in zip(sections, texts, want, got):
+        if w:
+            stats.sections[s.title] = (w, g)
+        if text:
+            rendered.append(s.render(text))
+    prompt = "\n".join(rendered)
+    stats.tokens = count_tokens(prompt)
+    return prompt, stats
@@ -0,0 +1,49 @@
+import functools
+from typing import Optional
+
+import tiktoken
+
+# Mistral's tokenizer is not on PyPI; cl100k counts are within ~10% of it on
+# English prose, which is what the budgets here need.
+ENCODING = "cl100k_base"
+CHARS_PER_TOKEN = 4
+
+
+@functools.lru_cache(maxsize=1)
+def _encoding() -> Optional[tiktoken.Encoding]:
+    try:
+        return tiktoken.get_encoding(ENCODING)
+    except Exception:
+        # the encoding is downloaded on first use; offline, estimate instead
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Approximate LLM token count of `text` (~4 characters per token offline)."""
+    enc = _encoding()
+    if enc is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """`text` cut to at most `max_tokens`, preferring to end on a paragraph,
+    line or sentence within the last fifth of what fits, else on a word."""
+    if max_tokens <= 0:
+        return ""
+    enc = _encoding()
+    if enc is None:
+        if len(text) <= max_tokens * CHARS_PER_TOKEN:
+            return text
+        prefix = text[: max_tokens * CHARS_PER_TOKEN]
+    else:
+        tokens = enc.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        prefix = enc.decode(tokens[:max_tokens])
+
+    for sep, share in (("\n\n", 0.8), ("\n", 0.8), (". ", 0.8), (" ", 0.5)):
+        cut = prefix.rfind(sep)
+        if cut >= share * len(prefix):
+            return prefix[: cut + 1].rstrip()
+    return prefix
@@ -1,13 +1,14 @@
-import asyncio
 import json
 
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
 
 from langchain_core.tools import BaseTool
 
 # MCP SDK imports
-from mcp import ClientSession, StdioServerParameters, types
-from mcp.client.stdio import stdio_client
+from mcp import types
+
+from .loop import run_async, run_sync
+from .pool import get_pool
 
 
 class MCPTool(BaseTool):
@@ -17,19 +18,16 @@ class MCPTool(BaseTool):
     mcp_tool_name: str
     timeout_s: Optional[float] = 30.0
 
-    async def _arun(self, **kwargs) -> str:
-        server_params = StdioServerParameters(
-            command=self.cmd,
-            args=self.mcp_args or [],
-            env=self.env,
+    async def _call(self, arguments: Dict[str, Any]) -> str:
+        result = await get_pool().call_tool(
+            self.cmd,
+            self.mcp_args,
+            self.env,
+            self.mcp_tool_name,
+            arguments,
+            timeout_s=self.timeout_s,
         )
 
-        async with stdio_client(server_params) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                call = session.call_tool(self.mcp_tool_name, arguments=kwargs)
-                result = await asyncio.wait_for(call, timeout=self.timeout_s)
-
         if getattr(result, "structuredContent", None) is not None:
             return json.dumps(result.structuredContent, ensure_ascii=False)
         if result.content:
@@ -38,15 +36,9 @@ class MCPTool(BaseTool):
                 return block.text
         return ""
 
+    async def _arun(self, **kwargs) -> str:
+        # sessions live on the shared background loop; the caller's loop only awaits
+        return await run_async(self._call(kwargs))
+
     def _run(self, **kwargs) -> str:
-        try:
-            asyncio.get_running_loop()
-        except RuntimeError:
-            # no running loop → fine to use asyncio.run
-            return asyncio.run(self._arun(**kwargs))
-        else:
-            import concurrent.futures
-
-            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as ex:
-                fut = ex.submit(lambda: asyncio.run(self._arun(**kwargs)))
-                return fut.result()
+        return run_sync(self._call(kwargs))
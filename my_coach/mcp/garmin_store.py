@@ -0,0 +1,196 @@
+import asyncio
+import hashlib
+import json
+import pathlib
+import sqlite3
+from contextlib import closing
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from my_coach.config import settings
+from .loop import run_sync
+from .mcp_garmin import garmin_tool
+
+_ROOT = pathlib.Path(__file__).resolve().parents[2]
+
+DateRange = Tuple[date, date]
+
+
+def _activity_list(snapshot: Dict[str, Any]) -> List[Dict[str, Any]]:
+    if not snapshot.get("result"):
+        return []
+    payload = snapshot["result"]["SnapshotFitnessDetails"]["payload"]
+    return payload.get("activityList") or []
+
+
+def _activity_key(activity: Dict[str, Any]) -> str:
+    if activity.get("activityId") is not None:
+        return str(activity["activityId"])
+    # no id: fall back on start time + type, stable across fetches
+    type_key = (activity.get("activityType") or {}).get("typeKey", "")
+    return f"{activity.get('startTimeLocal', '')}|{type_key}"
+
+
+def _activity_day(activity: Dict[str, Any]) -> str:
+    return str(activity.get("startTimeLocal") or "")[:10]
+
+
+def _chunks(ranges: List[DateRange], days: int) -> List[DateRange]:
+    out = []
+    for start, end in ranges:
+        while start <= end:
+            stop = min(end, start + timedelta(days=days - 1))
+            out.append((start, stop))
+            start = stop + timedelta(days=1)
+    return out
+
+
+class ActivityStore:
+    """Per-user SQLite cache of Garmin activities and of the date range synced.
+
+    The synced range is kept contiguous, so a request only needs the days before
+    it and the days since its last day (re-fetched: it may have been partial).
+    A fetch that does not touch the synced range leaves it as is: its
+    activities are stored, but the range is fetched again next time.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS activities ("
+                " activity_id TEXT PRIMARY KEY,"
+                " day TEXT NOT NULL,"
+                " payload TEXT NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS activities_day ON activities(day)")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS sync ("
+                " id INTEGER PRIMARY KEY CHECK (id = 0),"
+                " synced_from TEXT NOT NULL,"
+                " synced_to TEXT NOT NULL)"
+            )
+
+    def _connect(self) -> "closing[sqlite3.Connection]":
+        # one short-lived connection per operation: safe across threads
+        return closing(sqlite3.connect(self.path, timeout=30))
+
+    @staticmethod
+    def _coverage(db: sqlite3.Connection) -> Optional[DateRange]:
+        row = db.execute(
+            "SELECT synced_from, synced_to FROM sync WHERE id = 0"
+        ).fetchone()
+        if row is None:
+            return None
+        return date.fromisoformat(row[0]), date.fromisoformat(row[1])
+
+    def coverage(self) -> Optional[DateRange]:
+        with self._connect() as db:
+            return self._coverage(db)
+
+    def missing_ranges(self, start: date, end: date) -> List[DateRange]:
+        cov = self.coverage()
+        if cov is None:
+            return [(start, end)]
+
+        lo, hi = cov
+        ranges = []
+        if start < lo:
+            ranges.append((start, min(end, lo - timedelta(days=1))))
+        if end >= hi:
+            ranges.append((hi, end))
+        return ranges
+
+    def merge(
+        self, activities: List[Dict[str, Any]], synced: Optional[DateRange] = None
+    ) -> None:
+        rows = [
+            (_activity_key(a), _activity_day(a), json.dumps(a, ensure_ascii=False))
+            for a in activities
+        ]
+        with self._connect() as db, db:
+            db.executemany(
+                "INSERT INTO activities (activity_id, day, payload) VALUES (?, ?, ?)"
+                " ON CONFLICT(activity_id) DO UPDATE SET"
+                " day = excluded.day, payload = excluded.payload",
+                rows,
+            )
+            cov = self._coverage(db) if synced is not None else None
+            if cov is not None:
+                day = timedelta(days=1)
+                if synced[0] > cov[1] + day or synced[1] < cov[0] - day:
+                    # apart from the synced range: recording the union would
+                    # mark the gap between them as synced too
+                    return
+                synced = (min(synced[0], cov[0]), max(synced[1], cov[1]))
+            if synced is not None:
+                db.execute(
+                    "INSERT INTO sync (id, synced_from, synced_to) VALUES (0, ?, ?)"
+                    " ON CONFLICT(id) DO UPDATE SET"
+                    " synced_from = excluded.synced_from,"
+                    " synced_to = excluded.synced_to",
+                    (synced[0].isoformat(), synced[1].isoformat()),
+                )
+
+    def activities(self, start: date, end: date) -> List[Dict[str, Any]]:
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT payload FROM activities WHERE day BETWEEN ? AND ? ORDER BY day",
+                (start.isoformat(), end.isoformat()),
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+
+_STORES: Dict[str, ActivityStore] = {}
+
+
+def get_store() -> ActivityStore:
+    token = (garmin_tool.env or {}).get("GARTH_TOKEN", "")
+    user = hashlib.sha256(token.encode()).hexdigest()[:16]
+    if user not in _STORES:
+        cache_dir = pathlib.Path(settings.garmin_cache_dir)
+        if not cache_dir.is_absolute():
+            cache_dir = _ROOT / cache_dir
+        _STORES[user] = ActivityStore(cache_dir / f"{user}.sqlite")
+    return _STORES[user]
+
+
+async def afetch_activities(
+    from_date: date, to_date: date, store: Optional[ActivityStore] = None
+) -> List[Dict[str, Any]]:
+    """Activities between the two dates, fetching only what the cache lacks.
+
+    Missing ranges are split into `garmin_chunk_days` chunks fetched concurrently.
+    """
+    store = store or get_store()
+    chunks = _chunks(
+        store.missing_ranges(from_date, to_date), settings.garmin_chunk_days
+    )
+
+    payloads = await asyncio.gather(
+        *(garmin_tool.ainvoke({"from_date": a, "to_date": b}) for a, b in chunks),
+        return_exceptions=True,
+    )
+
+    errors = [p for p in payloads if isinstance(p, BaseException)]
+    fetched = [
+        a
+        for p in payloads
+        if not isinstance(p, BaseException)
+        for a in _activity_list(json.loads(p))
+    ]
+    # only extend the synced range when there is no hole in it
+    synced = (chunks[0][0], chunks[-1][1]) if chunks and not errors else None
+    await asyncio.to_thread(store.merge, fetched, synced)
+
+    if errors:
+        raise errors[0]
+
+    return await asyncio.to_thread(store.activities, from_date, to_date)
+
+
+def fetch_activities(
+    from_date: date, to_date: date, store: Optional[ActivityStore] = None
+) -> List[Dict[str, Any]]:
+    return run_sync(afetch_activities(from_date, to_date, store))
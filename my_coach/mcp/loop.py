@@ -0,0 +1,49 @@
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional, TypeVar
+
+T = TypeVar("T")
+
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_LOCK = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Long-lived event loop running in a daemon thread.
+
+    MCP sessions are bound to the loop that opened them, so every tool call is
+    executed here and the pooled servers outlive any single caller.
+    """
+    global _LOOP
+    with _LOCK:
+        if _LOOP is None or _LOOP.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=loop.run_forever, name="my-coach-loop", daemon=True
+            ).start()
+            _LOOP = loop
+    return _LOOP
+
+
+def _on_loop(loop: asyncio.AbstractEventLoop) -> bool:
+    try:
+        return asyncio.get_running_loop() is loop
+    except RuntimeError:
+        return False
+
+
+def run_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """Block the calling thread until `coro` has run on the background loop."""
+    loop = get_loop()
+    if _on_loop(loop):
+        coro.close()
+        raise RuntimeError("run_sync() called from the background loop; await instead.")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+async def run_async(coro: Coroutine[Any, Any, T]) -> T:
+    """Await `coro` on the background loop without blocking the caller's loop."""
+    loop = get_loop()
+    if _on_loop(loop):
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
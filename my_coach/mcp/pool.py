@@ -0,0 +1,241 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional, Tuple
+from weakref import WeakKeyDictionary
+
+import anyio
+from mcp import ClientSession, StdioServerParameters, types
+from mcp.client.stdio import stdio_client
+from mcp.shared.exceptions import McpError
+
+from my_coach.config import settings
+
+PoolKey = Tuple[str, Tuple[str, ...], Tuple[Tuple[str, str], ...]]
+
+_TRANSPORT_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError)
+
+
+def _pool_key(
+    cmd: str, args: Optional[list[str]], env: Optional[Dict[str, str]]
+) -> PoolKey:
+    return (cmd, tuple(args or ()), tuple(sorted((env or {}).items())))
+
+
+def _is_transport_error(e: BaseException) -> bool:
+    if isinstance(e, _TRANSPORT_ERRORS):
+        return True
+    return isinstance(e, McpError) and e.error.code == types.CONNECTION_CLOSED
+
+
+class _PooledSession:
+    """One initialized MCP server, owned by a long-lived task.
+
+    The stdio transport is built on anyio task groups, which must be entered and
+    exited by the same task, so the session lives inside `_serve` and callers only
+    borrow `self.session`.
+    """
+
+    def __init__(self, params: StdioServerParameters, idle_timeout_s: Optional[float]):
+        self.params = params
+        self.idle_timeout_s = idle_timeout_s
+        self.session: Optional[ClientSession] = None
+        self.inflight = 0
+        self.last_used = time.monotonic()
+        self.last_checked = self.last_used
+        self._closing = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def alive(self) -> bool:
+        return (
+            self.session is not None
+            and self._task is not None
+            and not self._task.done()
+        )
+
+    async def start(self, timeout_s: Optional[float]) -> None:
+        ready = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._serve(ready))
+        try:
+            await asyncio.wait_for(asyncio.shield(ready), timeout=timeout_s)
+        except BaseException:
+            await self.close()
+            raise
+
+    async def _serve(self, ready: asyncio.Future) -> None:
+        try:
+            async with stdio_client(self.params) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    self.session = session
+                    ready.set_result(None)
+                    await self._wait_until_idle()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+        finally:
+            self.session = None
+            if not ready.done():
+                ready.cancel()
+
+    async def _wait_until_idle(self) -> None:
+        if self.idle_timeout_s is None:
+            await self._closing.wait()
+            return
+
+        poll_s = max(0.05, min(self.idle_timeout_s / 4, 5.0))
+        while True:
+            try:
+                await asyncio.wait_for(self._closing.wait(), timeout=poll_s)
+                return
+            except asyncio.TimeoutError:
+                idle_for = time.monotonic() - self.last_used
+                if self.inflight == 0 and idle_for >= self.idle_timeout_s:
+                    return
+
+    async def healthy(self, timeout_s: Optional[float]) -> bool:
+        session = self.session
+        if not self.alive or session is None:
+            return False
+        try:
+            await asyncio.wait_for(session.send_ping(), timeout=timeout_s)
+        except Exception:
+            return False
+        self.last_checked = time.monotonic()
+        return True
+
+    async def close(self, timeout_s: float = 5.0) -> None:
+        self._closing.set()
+        task = self._task
+        if task is None or task.done():
+            return
+        if self.session is None:
+            # still handshaking: nothing to shut down gracefully
+            task.cancel()
+        done, _ = await asyncio.wait({task}, timeout=timeout_s)
+        if not done:
+            task.cancel()
+            await asyncio.wait({task}, timeout=timeout_s)
+
+
+class MCPSessionPool:
+    """Keeps initialized MCP stdio sessions alive, keyed by (cmd, args, env).
+
+    A `ClientSession` multiplexes requests, so concurrent callers share one
+    server per key. Sessions that sat unused for `health_check_interval_s` are
+    pinged before being handed out, dead ones are restarted, and sessions idle
+    for `idle_timeout_s` shut their server down on their own.
+    """
+
+    def __init__(
+        self,
+        idle_timeout_s: Optional[float] = None,
+        health_check_interval_s: Optional[float] = None,
+        startup_timeout_s: Optional[float] = None,
+    ):
+        self.idle_timeout_s = (
+            settings.mcp_idle_timeout_s if idle_timeout_s is None else idle_timeout_s
+        )
+        self.health_check_interval_s = (
+            settings.mcp_health_check_interval_s
+            if health_check_interval_s is None
+            else health_check_interval_s
+        )
+        self.startup_timeout_s = (
+            settings.mcp_startup_timeout_s
+            if startup_timeout_s is None
+            else startup_timeout_s
+        )
+        self._sessions: Dict[PoolKey, _PooledSession] = {}
+        self._locks: Dict[PoolKey, asyncio.Lock] = {}
+
+    def _needs_check(self, pooled: _PooledSession) -> bool:
+        now = time.monotonic()
+        last_seen = max(pooled.last_used, pooled.last_checked)
+        return now - last_seen >= self.health_check_interval_s
+
+    async def _acquire(self, key: PoolKey) -> _PooledSession:
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            pooled = self._sessions.get(key)
+
+            if pooled is not None and (
+                not pooled.alive
+                or (
+                    self._needs_check(pooled)
+                    and not await pooled.healthy(self.startup_timeout_s)
+                )
+            ):
+                self._sessions.pop(key, None)
+                await pooled.close()
+                pooled = None
+
+            if pooled is None:
+                cmd, args, env = key
+                params = StdioServerParameters(
+                    command=cmd, args=list(args), env=dict(env) or None
+                )
+                pooled = _PooledSession(params, self.idle_timeout_s)
+                await pooled.start(self.startup_timeout_s)
+                self._sessions[key] = pooled
+
+            pooled.inflight += 1
+            return pooled
+
+    def _release(self, pooled: _PooledSession) -> None:
+        pooled.inflight -= 1
+        pooled.last_used = time.monotonic()
+
+    async def _discard(self, key: PoolKey, pooled: _PooledSession) -> None:
+        if self._sessions.get(key) is pooled:
+            self._sessions.pop(key, None)
+        await pooled.close()
+
+    async def call_tool(
+        self,
+        cmd: str,
+        args: Optional[list[str]],
+        env: Optional[Dict[str, str]],
+        tool_name: str,
+        arguments: Dict[str, Any],
+        timeout_s: Optional[float] = None,
+    ) -> types.CallToolResult:
+        key = _pool_key(cmd, args, env)
+
+        # one retry: a server that died between health checks is restarted once
+        attempts = 2
+        for attempt in range(attempts):
+            pooled = await self._acquire(key)
+            try:
+                session = pooled.session
+                if session is None:
+                    raise anyio.ClosedResourceError()
+                call = session.call_tool(tool_name, arguments=arguments)
+                return await asyncio.wait_for(call, timeout=timeout_s)
+            except Exception as e:
+                if not _is_transport_error(e):
+                    raise
+                await self._discard(key, pooled)
+                if attempt == attempts - 1:
+                    raise
+            finally:
+                self._release(pooled)
+
+    async def aclose(self) -> None:
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        await asyncio.gather(*(s.close() for s in sessions), return_exceptions=True)
+
+
+_POOLS: "WeakKeyDictionary[asyncio.AbstractEventLoop, MCPSessionPool]" = (
+    WeakKeyDictionary()
+)
+
+
+def get_pool() -> MCPSessionPool:
+    """Pool bound to the running event loop (sessions cannot cross loops)."""
+    loop = asyncio.get_running_loop()
+    pool = _POOLS.get(loop)
+    if pool is None:
+        pool = _POOLS[loop] = MCPSessionPool()
+    return pool
@@ -0,0 +1,134 @@
+import json
+import pathlib
+import re
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+BM25 = "bm25"
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i if in into "
+    "is it its me my no not of on or our should so than that the their them then "
+    "there these they this to was we what when where which who why will with you "
+    "your".split()
+)
+
+
+def _stem(token: str) -> str:
+    # plural folding only: "injuries" ~ "injury", "tendons" ~ "tendon"
+    if token.endswith("ies") and len(token) > 4:
+        return token[:-3] + "y"
+    if token.endswith("s") and not token.endswith("ss") and len(token) > 3:
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        _stem(t)
+        for t in _TOKEN.findall(text.lower())
+        if t not in _STOPWORDS and len(t) > 1
+    ]
+
+
+class BM25Index:
+    """Okapi BM25 over the chunks of one shard, in FAISS row order.
+
+    Postings are stored per term in CSR form with their BM25 weight already
+    computed, so a query is a gather and a scatter-add, with no embedding call.
+    Arrays are memory-mapped like the chunk store.
+    """
+
+    def __init__(
+        self,
+        vocab: Dict[str, int],
+        indptr: np.ndarray,
+        rows: np.ndarray,
+        weights: np.ndarray,
+        n: int,
+    ):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.rows = rows
+        self.weights = weights
+        self.n = n
+
+    @classmethod
+    def build(
+        cls, texts: Sequence[str], k1: float = 1.2, b: float = 0.75
+    ) -> "BM25Index":
+        counts = [Counter(tokenize(t)) for t in texts]
+        lengths = np.array([sum(c.values()) for c in counts], dtype=np.float32)
+        avg = float(lengths.mean()) if len(lengths) and lengths.any() else 1.0
+
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for row, c in enumerate(counts):
+            for term, tf in c.items():
+                postings.setdefault(term, []).append((row, tf))
+
+        vocab = {term: i for i, term in enumerate(sorted(postings))}
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        rows, weights = [], []
+        n = len(texts)
+        for term, i in vocab.items():
+            plist = postings[term]
+            df = len(plist)
+            idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            r = np.array([p[0] for p in plist], dtype=np.int32)
+            tf = np.array([p[1] for p in plist], dtype=np.float32)
+            norm = k1 * (1.0 - b + b * lengths[r] / avg)
+            rows.append(r)
+            weights.append((idf * tf * (k1 + 1.0) / (tf + norm)).astype(np.float32))
+            indptr[i + 1] = indptr[i] + df
+        return cls(
+            vocab,
+            indptr,
+            np.concatenate(rows) if rows else np.zeros(0, dtype=np.int32),
+            np.concatenate(weights) if weights else np.zeros(0, dtype=np.float32),
+            n,
+        )
+
+    @staticmethod
+    def exists(path: pathlib.Path) -> bool:
+        return (path / f"{BM25}.json").exists()
+
+    @staticmethod
+    def files(path: pathlib.Path) -> List[pathlib.Path]:
+        names = ["indptr.npy", "rows.npy", "weights.npy", "json"]
+        return [path / f"{BM25}.{n}" for n in names]
+
+    def save(self, path: pathlib.Path) -> None:
+        np.save(path / f"{BM25}.indptr.npy", self.indptr)
+        np.save(path / f"{BM25}.rows.npy", self.rows)
+        np.save(path / f"{BM25}.weights.npy", self.weights)
+        (path / f"{BM25}.json").write_text(
+            json.dumps({"n": self.n, "vocab": self.vocab}, ensure_ascii=False)
+        )
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> "BM25Index":
+        meta = json.loads((path / f"{BM25}.json").read_text())
+        return cls(
+            meta["vocab"],
+            np.load(path / f"{BM25}.indptr.npy", mmap_mode="r"),
+            np.load(path / f"{BM25}.rows.npy", mmap_mode="r"),
+            np.load(path / f"{BM25}.weights.npy", mmap_mode="r"),
+            meta["n"],
+        )
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[int, float]]:
+        """Top `k` (row, score) pairs, best first; rows without a query term are left out."""
+        ids = [self.vocab[t] for t in set(tokenize(query)) if t in self.vocab]
+        if not ids or not self.n:
+            return []
+        scores = np.zeros(self.n, dtype=np.float32)
+        for i in ids:
+            start, end = self.indptr[i], self.indptr[i + 1]
+            # a term lists each row once, so plain fancy-index += is safe
+            scores[self.rows[start:end]] += self.weights[start:end]
+        hit = np.flatnonzero(scores)
+        top = hit[np.argsort(-scores[hit], kind="stable")[:k]]
+        return [(int(r), float(scores[r])) for r in top]
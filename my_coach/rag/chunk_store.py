@@ -0,0 +1,258 @@
+import json
+import logging
+import mmap
+import pathlib
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Sequence
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.base import Docstore
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from my_coach.config import settings
+from .bm25 import BM25Index
+from .index_types import set_search_params
+
+logger = logging.getLogger(__name__)
+
+# approximate index built from index.faiss, same row order; served while the
+# "source" stamp in its info still matches index.faiss
+ANN_INDEX = "index.ann.faiss"
+ANN_INFO = "index.ann.json"
+
+# one file per column, all sharing the FAISS row order
+TEXT = "chunks.text"
+IDS = "chunks.ids"
+META = "chunks.meta"
+
+
+def _write_strings(path: pathlib.Path, name: str, values: Sequence[str]) -> None:
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    (path / f"{name}.bin").write_bytes(b"".join(encoded))
+    np.save(path / f"{name}.idx.npy", offsets)
+
+
+class _Strings:
+    """Strings decoded on demand from a mmapped UTF-8 blob and its offsets."""
+
+    def __init__(self, path: pathlib.Path, name: str):
+        self.offsets = np.load(path / f"{name}.idx.npy", mmap_mode="r")
+        blob = path / f"{name}.bin"
+        if blob.stat().st_size:
+            with open(blob, "rb") as f:
+                self.blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.blob = b""  # mmap refuses empty files
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self.blob[start:end].decode("utf-8")
+
+
+class ChunkStore:
+    """Chunk texts, ids and metadata in flat files, read without unpickling.
+
+    Texts and ids are UTF-8 blobs with an offsets table. Metadata is columnar:
+    one int32 code per (chunk, key) into a small per-key table of distinct
+    values (-1 when the chunk lacks the key), since most keys are per file.
+    Everything is memory-mapped, so opening is O(1) and processes share pages.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self.texts = _Strings(path, TEXT)
+        self.ids = _Strings(path, IDS)
+        meta = json.loads((path / f"{META}.json").read_text())
+        self.keys: List[str] = meta["keys"]
+        self.values: List[List[Any]] = meta["values"]
+        self.codes = np.load(path / f"{META}.npy", mmap_mode="r")
+
+    @staticmethod
+    def exists(path: pathlib.Path) -> bool:
+        return (path / f"{META}.json").exists()
+
+    @staticmethod
+    def write(path: pathlib.Path, documents: Sequence[Document]) -> None:
+        path.mkdir(parents=True, exist_ok=True)
+        _write_strings(path, TEXT, [d.page_content for d in documents])
+        _write_strings(path, IDS, [d.id or "" for d in documents])
+
+        keys = sorted({k for d in documents for k in d.metadata})
+        tables: List[Dict[str, int]] = [{} for _ in keys]
+        values: List[List[Any]] = [[] for _ in keys]
+        codes = np.full((len(documents), len(keys)), -1, dtype=np.int32)
+        for row, d in enumerate(documents):
+            for col, key in enumerate(keys):
+                if key not in d.metadata:
+                    continue
+                value = d.metadata[key]
+                token = json.dumps(value, sort_keys=True, default=str)
+                if token not in tables[col]:
+                    tables[col][token] = len(values[col])
+                    values[col].append(json.loads(token))
+                codes[row, col] = tables[col][token]
+
+        np.save(path / f"{META}.npy", codes)
+        (path / f"{META}.json").write_text(
+            json.dumps({"keys": keys, "values": values}, ensure_ascii=False)
+        )
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def metadata(self, i: int) -> Dict[str, Any]:
+        row = self.codes[i]
+        return {
+            key: self.values[col][code]
+            for col, (key, code) in enumerate(zip(self.keys, row.tolist()))
+            if code >= 0
+        }
+
+    def document(self, i: int) -> Document:
+        return Document(
+            id=self.ids[i] or None,
+            page_content=self.texts[i],
+            metadata=self.metadata(i),
+        )
+
+    def documents(self) -> Iterator[Document]:
+        for i in range(len(self)):
+            yield self.document(i)
+
+
+class ChunkDocstore(Docstore):
+    """Read-only docstore over a ChunkStore, addressed by FAISS row number."""
+
+    def __init__(self, store: ChunkStore):
+        self.store = store
+
+    def search(self, search: str) -> Document:
+        return self.store.document(int(search))
+
+
+class _RowIds(Mapping):
+    # FAISS row i -> docstore id str(i), without building an n-entry dict
+    def __init__(self, n: int):
+        self.n = n
+
+    def __getitem__(self, i: int) -> str:
+        if not 0 <= i < self.n:
+            raise KeyError(i)
+        return str(i)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(self.n))
+
+    def __len__(self) -> int:
+        return self.n
+
+
+def _read_index(path: pathlib.Path, mmap_vectors: bool) -> faiss.Index:
+    if mmap_vectors:
+        flag = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+        try:
+            return faiss.read_index(str(path), flag)
+        except RuntimeError:
+            pass  # index type without mmap support
+    return faiss.read_index(str(path))
+
+
+def index_stamp(path: pathlib.Path) -> Dict[str, int]:
+    """Size and mtime of the exact index, recorded by what is derived from it."""
+    stat = (path / "index.faiss").stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _ann_is_current(path: pathlib.Path) -> bool:
+    # the row count alone cannot tell a re-ingest that removed and added as
+    # many chunks as it kept: rows would point at other chunks
+    info_path = path / ANN_INFO
+    if not (path / ANN_INDEX).exists() or not info_path.exists():
+        return False
+    info = json.loads(info_path.read_text())
+    return info.get("source") == index_stamp(path)
+
+
+def save_faiss(vs: FAISS, path: pathlib.Path) -> None:
+    """Write `vs` as index.faiss plus its chunk store and BM25 index, in row order."""
+    path.mkdir(parents=True, exist_ok=True)
+    faiss.write_index(vs.index, str(path / "index.faiss"))
+    docs = []
+    for i in range(vs.index.ntotal):
+        doc_id = vs.index_to_docstore_id[i]
+        doc = vs.docstore.search(doc_id)
+        docs.append(
+            Document(id=doc_id, page_content=doc.page_content, metadata=doc.metadata)
+        )
+    ChunkStore.write(path, docs)
+    BM25Index.build([d.page_content for d in docs]).save(path)
+
+
+def load_faiss(
+    path: pathlib.Path, embeddings: Embeddings, writable: bool = False
+) -> FAISS:
+    """Open an index saved by `save_faiss`.
+
+    Read-only stores are memory-mapped and decode chunks on access, and search
+    the approximate index when ingest built one; a `writable` store is the
+    exact index materialized in memory, so chunks can be added and deleted by id.
+    The pickled layout of earlier versions is only opened `writable`, so ingest
+    can convert it; serving refuses to unpickle it.
+    """
+    if not ChunkStore.exists(path):
+        if not writable:
+            raise ValueError(
+                f"{path} holds a pickled index of an earlier version; convert it "
+                "with `python my_coach/scripts/ingest.py --rebuild`"
+            )
+        logger.warning(
+            "%s: unpickling a legacy index; the next save converts it "
+            "(or run `python my_coach/scripts/ingest.py --rebuild`)",
+            path,
+        )
+        return FAISS.load_local(
+            str(path), embeddings, allow_dangerous_deserialization=True
+        )
+
+    store = ChunkStore(path)
+    if not writable:
+        index = None
+        if _ann_is_current(path):
+            index = set_search_params(
+                _read_index(path / ANN_INDEX, mmap_vectors=False),
+                nprobe=settings.faiss_nprobe,
+                ef_search=settings.faiss_ef_search,
+            )
+            if index.ntotal != len(store):
+                index = None  # left behind by an interrupted ingest
+        if index is None:
+            index = _read_index(path / "index.faiss", mmap_vectors=True)
+        return FAISS(embeddings, index, ChunkDocstore(store), _RowIds(len(store)))
+
+    index = _read_index(path / "index.faiss", mmap_vectors=False)
+
+    docs = list(store.documents())
+    return FAISS(
+        embeddings,
+        index,
+        InMemoryDocstore({d.id: d for d in docs}),
+        {i: d.id for i, d in enumerate(docs)},
+    )
+
+
+def index_files(path: pathlib.Path) -> List[pathlib.Path]:
+    """Files written by `save_faiss`, index first."""
+    names = ["index.faiss", f"{META}.json", f"{META}.npy"]
+    for base in (TEXT, IDS):
+        names += [f"{base}.bin", f"{base}.idx.npy"]
+    # bm25.json last: its presence marks the lexical index complete
+    return [path / n for n in names] + BM25Index.files(path)
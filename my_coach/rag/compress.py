@@ -0,0 +1,107 @@
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from my_coach.llm.tokens import count_tokens
+from .bm25 import BM25Index
+
+# sentence ends, and blank lines (PDF headings, list items)
+_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[A-Z0-9])|\n\s*\n")
+GAP = " … "
+
+
+def split_sentences(text: str) -> List[str]:
+    parts = (" ".join(p.split()) for p in _BOUNDARY.split(text))
+    return [p for p in parts if p]
+
+
+def _lexical_scores(sentences: List[str], query: str) -> np.ndarray:
+    # BM25 with the sentences as the collection: rare query words count most
+    scores = np.zeros(len(sentences), dtype=np.float32)
+    for row, score in BM25Index.build(sentences).search(query, len(sentences)):
+        scores[row] = score
+    return scores
+
+
+def _embedding_scores(
+    sentences: List[str], query: str, embeddings: Embeddings
+) -> np.ndarray:
+    vectors = np.asarray(embeddings.embed_documents(sentences), dtype=np.float32)
+    q = np.asarray(embeddings.embed_query(query), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-9
+    return vectors @ (q / (np.linalg.norm(q) + 1e-9))
+
+
+def compress_chunks(
+    chunks: Sequence[str],
+    query: str,
+    max_tokens: int,
+    embeddings: Optional[Embeddings] = None,
+) -> List[str]:
+    """Each chunk cut down to its sentences most relevant to `query`.
+
+    Sentences are scored by BM25 against `query`, or by cosine similarity
+    when `embeddings` is given. The best sentence of every chunk is taken
+    first, so each source keeps its evidence; the rest go by score until
+    `max_tokens` is spent. Kept sentences stay in their original order, with
+    GAP where text was left out. A chunk with no room left comes back "".
+    """
+    sentences: List[Tuple[int, int, str]] = [
+        (c, s, text)
+        for c, chunk in enumerate(chunks)
+        for s, text in enumerate(split_sentences(chunk))
+    ]
+    if not sentences:
+        return ["" for _ in chunks]
+    texts = [text for _, _, text in sentences]
+    if embeddings is not None:
+        scores = _embedding_scores(texts, query, embeddings)
+    else:
+        scores = _lexical_scores(texts, query)
+
+    by_score = sorted(range(len(sentences)), key=lambda i: -scores[i])
+    best: Dict[int, int] = {}
+    for i in by_score:
+        best.setdefault(sentences[i][0], i)
+    firsts = set(best.values())
+    # after each chunk's best, only sentences that match the query at all
+    order = [best[c] for c in sorted(best)] + [
+        i for i in by_score if i not in firsts and scores[i] > 0
+    ]
+
+    picked, used = set(), 0
+    for i in order:
+        cost = count_tokens(texts[i])
+        if used + cost > max_tokens:
+            continue
+        picked.add(i)
+        used += cost
+
+    parts: List[List[str]] = [[] for _ in chunks]
+    last: Dict[int, int] = {}
+    for i in sorted(picked):
+        c, s, text = sentences[i]
+        if parts[c]:
+            parts[c].append(" " if s == last[c] + 1 else GAP)
+        parts[c].append(text)
+        last[c] = s
+    return ["".join(p) for p in parts]
+
+
+def compress_context(
+    chunks: Sequence[str],
+    query: str,
+    max_tokens: int,
+    embeddings: Optional[Embeddings] = None,
+) -> str:
+    """The `[i] text` RAG context of `chunks`, compressed to `max_tokens`.
+
+    Numbering follows `chunks` (1-based) even when a chunk is dropped, so
+    `[i]` still matches the i-th source of the bibliography.
+    """
+    compressed = compress_chunks(chunks, query, max_tokens, embeddings)
+    return "\n\n".join(
+        f"[{i}] {text}" for i, text in enumerate(compressed, start=1) if text
+    )
@@ -0,0 +1,161 @@
+import hashlib
+import pathlib
+import re
+from dataclasses import dataclass
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from my_coach.llm.tokens import count_tokens
+
+_WORD = re.compile(r"\w+")
+_PRIME = np.uint64(4294967291)  # largest prime below 2**32
+
+NUM_PERM = 64
+SIGNATURES = "minhash.npz"
+_rng = np.random.default_rng(1)
+# a * x + b stays below 2**64 for 32-bit x
+_A = _rng.integers(1, 1 << 31, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 31, NUM_PERM, dtype=np.uint64)
+
+
+def _shingles(text: str, n: int = 3) -> Set[str]:
+    words = _WORD.findall(text.lower())
+    if len(words) <= n:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i : i + n]) for i in range(len(words) - n + 1)}
+
+
+def minhash(text: str) -> np.ndarray:
+    """MinHash signature of the word 3-grams of `text` (NUM_PERM uint32s).
+
+    The share of equal positions in two signatures estimates the Jaccard
+    similarity of the texts' 3-gram sets.
+    """
+    shingles = _shingles(text)
+    if not shingles:
+        return np.full(NUM_PERM, np.iinfo(np.uint32).max, dtype=np.uint32)
+    x = np.array(
+        [
+            int.from_bytes(
+                hashlib.blake2b(s.encode(), digest_size=4).digest(), "little"
+            )
+            for s in shingles
+        ],
+        dtype=np.uint64,
+    )
+    return ((np.outer(x, _A) + _B) % _PRIME).min(axis=0).astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(a == b))
+
+
+def save_signatures(path: pathlib.Path, sigs: Dict[str, np.ndarray]) -> None:
+    """Write {chunk id: signature} to `path`/SIGNATURES."""
+    ids = list(sigs)
+    matrix = np.stack([sigs[i] for i in ids]) if ids else np.zeros((0, NUM_PERM))
+    np.savez(
+        path / SIGNATURES,
+        ids=np.array(ids, dtype=str),
+        sigs=matrix.astype(np.uint32),
+    )
+
+
+def load_signatures(path: pathlib.Path) -> Dict[str, np.ndarray]:
+    if not (path / SIGNATURES).exists():
+        return {}
+    with np.load(path / SIGNATURES) as data:
+        return dict(zip(data["ids"].tolist(), data["sigs"]))
+
+
+class NearDuplicateIndex:
+    """MinHash signatures bucketed by LSH bands, so a lookup only compares
+    signatures that agree on a whole band.
+
+    16 bands of 4 rows find pairs at Jaccard 0.8 with probability ~0.9998
+    while unrelated chunks almost never share a bucket; candidates are then
+    checked against `threshold` on the full signature.
+    """
+
+    def __init__(self, threshold: float = 0.8, bands: int = 16):
+        self.threshold = threshold
+        self.rows = NUM_PERM // bands
+        self.bands = bands
+        self._sigs: Dict[Hashable, np.ndarray] = {}
+        self._buckets: Dict[Tuple[int, bytes], Set[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return len(self._sigs)
+
+    def _keys(self, sig: np.ndarray) -> List[Tuple[int, bytes]]:
+        r = self.rows
+        return [(i, sig[i * r : (i + 1) * r].tobytes()) for i in range(self.bands)]
+
+    def find(self, sig: np.ndarray) -> Optional[Hashable]:
+        """A stored key whose text is a near-duplicate of `sig`'s, if any."""
+        seen: Set[Hashable] = set()
+        for band in self._keys(sig):
+            for key in self._buckets.get(band, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                if similarity(self._sigs[key], sig) >= self.threshold:
+                    return key
+        return None
+
+    def signatures(self) -> Dict[Hashable, np.ndarray]:
+        return dict(self._sigs)
+
+    def add(self, key: Hashable, sig: np.ndarray) -> None:
+        self._sigs[key] = sig
+        for band in self._keys(sig):
+            self._buckets.setdefault(band, set()).add(key)
+
+    def remove(self, keys: Iterable[Hashable]) -> None:
+        for key in keys:
+            sig = self._sigs.pop(key, None)
+            if sig is None:
+                continue
+            for band in self._keys(sig):
+                self._buckets[band].discard(key)
+
+
+@dataclass
+class DedupStats:
+    chunks: int = 0
+    bytes: int = 0
+    tokens: int = 0
+
+    def add(self, text: str) -> None:
+        self.chunks += 1
+        self.bytes += len(text.encode("utf-8"))
+        self.tokens += count_tokens(text)
+
+    def merge(self, other: "DedupStats") -> None:
+        self.chunks += other.chunks
+        self.bytes += other.bytes
+        self.tokens += other.tokens
+
+    def __str__(self) -> str:
+        return (
+            f"{self.chunks} near-duplicate chunks "
+            f"({self.bytes / 1e3:.1f} kB, ~{self.tokens} tokens)"
+        )
+
+
+def drop_near_duplicates(
+    docs: List[Document], threshold: float = 0.8
+) -> Tuple[List[Document], DedupStats]:
+    """`docs` without near-repeats of an earlier document, in order."""
+    seen = NearDuplicateIndex(threshold)
+    kept, stats = [], DedupStats()
+    for i, doc in enumerate(docs):
+        sig = minhash(doc.page_content)
+        if seen.find(sig) is not None:
+            stats.add(doc.page_content)
+            continue
+        seen.add(i, sig)
+        kept.append(doc)
+    return kept, stats
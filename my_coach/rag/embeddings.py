@@ -0,0 +1,355 @@
+import asyncio
+import hashlib
+import pathlib
+import random
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_mistralai import MistralAIEmbeddings
+
+from my_coach.config import settings
+
+_ROOT = pathlib.Path(__file__).resolve().parents[2]
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic local embeddings with a simulated per-request latency.
+
+    Vectors are derived from a hash of the text, so the same text always maps to
+    the same unit vector. Like a hosted API, a call is split into requests of at
+    most `request_size` texts that each take `latency_s`; `fail_rate` makes a
+    share of calls raise, to exercise retries.
+    """
+
+    def __init__(
+        self,
+        size: int = 1024,
+        latency_s: float = 0.0,
+        request_size: int = 64,
+        fail_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.size = size
+        self.latency_s = latency_s
+        self.request_size = request_size
+        self.fail_rate = fail_rate
+        self._rng = random.Random(seed)
+        self.requests = 0
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+        v = np.random.default_rng(seed).standard_normal(self.size)
+        return (v / np.linalg.norm(v)).tolist()
+
+    def _maybe_fail(self) -> None:
+        self.requests += 1
+        if self.fail_rate and self._rng.random() < self.fail_rate:
+            raise RuntimeError("fake embedding request failed")
+
+    def _latency(self, n: int) -> float:
+        return self.latency_s * -(-n // self.request_size)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self._latency(len(texts)))
+        self._maybe_fail()
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self._latency(len(texts)))
+        self._maybe_fail()
+        return [self._vector(t) for t in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+@dataclass
+class EmbedStats:
+    texts: int = 0
+    batches: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        return self.texts / self.seconds if self.seconds else 0.0
+
+
+@dataclass
+class BatchEmbedder:
+    """Embeds texts in batches, several requests in flight, retrying failures.
+
+    A failed batch is retried up to `max_retries` times with exponential backoff
+    and jitter; `on_progress(done, total, stats)` is called after every batch.
+    """
+
+    embeddings: Embeddings
+    batch_size: int = 64
+    concurrency: int = 4
+    max_retries: int = 5
+    backoff_s: float = 1.0
+    max_backoff_s: float = 30.0
+    on_progress: Optional[Callable[[int, int, EmbedStats], None]] = None
+    stats: EmbedStats = field(default_factory=EmbedStats)
+
+    async def _embed_batch(
+        self, batch: List[str], sem: asyncio.Semaphore
+    ) -> List[List[float]]:
+        async with sem:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    return await self.embeddings.aembed_documents(batch)
+                except Exception:
+                    if attempt == self.max_retries:
+                        raise
+                    self.stats.retries += 1
+                    delay = min(self.max_backoff_s, self.backoff_s * 2**attempt)
+                    await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        sem = asyncio.Semaphore(self.concurrency)
+        batches = [
+            texts[i : i + self.batch_size]
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        done = 0
+        t0, spent = time.perf_counter(), self.stats.seconds
+
+        async def run(batch: List[str]) -> List[List[float]]:
+            nonlocal done
+            vectors = await self._embed_batch(batch, sem)
+            done += len(batch)
+            self.stats.texts += len(batch)
+            self.stats.batches += 1
+            self.stats.seconds = spent + time.perf_counter() - t0
+            if self.on_progress:
+                self.on_progress(done, len(texts), self.stats)
+            return vectors
+
+        results = await asyncio.gather(*(run(b) for b in batches))
+        return [v for vectors in results for v in vectors]
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return asyncio.run(self.aembed(texts))
+
+
+class EmbeddingCache:
+    """SQLite store of float32 vectors keyed by a hash of (namespace, text).
+
+    Least recently used entries are evicted once the vectors take more than
+    `max_bytes`. Hit and miss counts are kept per process.
+    """
+
+    def __init__(self, path: pathlib.Path, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY,"
+                " vector BLOB NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_lru ON embeddings(last_used)"
+            )
+            self._size = db.execute(
+                "SELECT COALESCE(SUM(length(vector)), 0) FROM embeddings"
+            ).fetchone()[0]
+
+    def _connect(self) -> "closing[sqlite3.Connection]":
+        # one short-lived connection per operation: safe across threads
+        return closing(sqlite3.connect(self.path, timeout=30))
+
+    @staticmethod
+    def key(namespace: str, text: str) -> str:
+        return hashlib.sha256(f"{namespace}\0{text}".encode()).hexdigest()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        with self._connect() as db, db:
+            # stay under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                part = list(keys[i : i + 500])
+                marks = ",".join("?" * len(part))
+                rows = db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", part
+                ).fetchall()
+                db.execute(
+                    f"UPDATE embeddings SET last_used = ? WHERE key IN ({marks})",
+                    [time.time(), *part],
+                )
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        rows = [
+            (key, np.asarray(vec, dtype=np.float32).tobytes(), time.time())
+            for key, vec in items.items()
+        ]
+        with self._connect() as db, db:
+            db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used)"
+                " VALUES (?, ?, ?)",
+                rows,
+            )
+        with self._lock:
+            self._size += sum(len(r[1]) for r in rows)
+            over = self._size > self.max_bytes
+        if over:
+            self.evict()
+
+    def evict(self, target: float = 0.9) -> int:
+        """Drop least recently used vectors until under `target * max_bytes`."""
+        with self._connect() as db, db:
+            size = db.execute(
+                "SELECT COALESCE(SUM(length(vector)), 0) FROM embeddings"
+            ).fetchone()[0]
+            excess = size - int(target * self.max_bytes)
+            doomed = []
+            if size > self.max_bytes:
+                for key, n in db.execute(
+                    "SELECT key, length(vector) FROM embeddings ORDER BY last_used"
+                ):
+                    if excess <= 0:
+                        break
+                    doomed.append((key,))
+                    excess -= n
+                    size -= n
+                db.executemany("DELETE FROM embeddings WHERE key = ?", doomed)
+        with self._lock:
+            self._size = size
+        return len(doomed)
+
+    def stats(self) -> Dict[str, float]:
+        with self._connect() as db:
+            entries, size = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length(vector)), 0) FROM embeddings"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+
+def model_id(embeddings: Embeddings) -> str:
+    """The "model:size" id of `embeddings` (of the model behind a cache wrapper)."""
+    embeddings = getattr(embeddings, "inner", embeddings)
+    model = getattr(embeddings, "model", None) or type(embeddings).__name__
+    size = getattr(embeddings, "size", None)
+    return f"{model}:{size}" if size else str(model)
+
+
+def _queries_as_documents(embeddings: Embeddings) -> bool:
+    # models whose embed_query is embed_documents([text]): queries can be batched
+    return isinstance(embeddings, (FakeEmbeddings, MistralAIEmbeddings))
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings that only ask `inner` for texts not already in `cache`.
+
+    Documents and queries are cached separately, since some models embed them
+    differently.
+    """
+
+    def __init__(self, inner: Embeddings, cache: EmbeddingCache):
+        self.inner = inner
+        self.cache = cache
+        self.namespace = model_id(inner)
+
+    def _split(self, texts: List[str], kind: str):
+        keys = [self.cache.key(f"{self.namespace}:{kind}", t) for t in texts]
+        found = self.cache.get_many(keys)
+        missing = list(dict.fromkeys(t for t, k in zip(texts, keys) if k not in found))
+        return keys, found, missing
+
+    def _join(self, texts, keys, found, missing, kind, vectors):
+        # round through float32 so a miss returns what a later hit will
+        fresh = {
+            self.cache.key(f"{self.namespace}:{kind}", t): np.asarray(
+                v, dtype=np.float32
+            ).tolist()
+            for t, v in zip(missing, vectors)
+        }
+        if fresh:
+            self.cache.put_many(fresh)
+        found.update(fresh)
+        return [found[k] for k in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._split(texts, "doc")
+        vectors = self.inner.embed_documents(missing) if missing else []
+        return self._join(texts, keys, found, missing, "doc", vectors)
+
+    def embed_query(self, text: str) -> List[float]:
+        keys, found, missing = self._split([text], "query")
+        vectors = [self.inner.embed_query(text)] if missing else []
+        return self._join([text], keys, found, missing, "query", vectors)[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Several queries, in one request when `inner` embeds them as documents."""
+        keys, found, missing = self._split(texts, "query")
+        if not missing:
+            vectors = []
+        elif _queries_as_documents(self.inner):
+            vectors = self.inner.embed_documents(missing)
+        else:
+            vectors = [self.inner.embed_query(t) for t in missing]
+        return self._join(texts, keys, found, missing, "query", vectors)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = await asyncio.to_thread(self._split, texts, "doc")
+        vectors = await self.inner.aembed_documents(missing) if missing else []
+        return await asyncio.to_thread(
+            self._join, texts, keys, found, missing, "doc", vectors
+        )
+
+    async def aembed_query(self, text: str) -> List[float]:
+        keys, found, missing = await asyncio.to_thread(self._split, [text], "query")
+        vectors = [await self.inner.aembed_query(text)] if missing else []
+        out = await asyncio.to_thread(
+            self._join, [text], keys, found, missing, "query", vectors
+        )
+        return out[0]
+
+
+_CACHE: Optional[EmbeddingCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            path = pathlib.Path(settings.embedding_cache_path)
+            if not path.is_absolute():
+                path = _ROOT / path
+            _CACHE = EmbeddingCache(path, settings.embedding_cache_max_mb << 20)
+        return _CACHE
+
+
+def cached(inner: Embeddings) -> CachedEmbeddings:
+    """`inner` behind the process-wide on-disk embedding cache."""
+    return CachedEmbeddings(inner, get_embedding_cache())
@@ -0,0 +1,91 @@
+import math
+from typing import Any, Optional
+
+import faiss
+import numpy as np
+
+# flat: exact scan; ivf / ivfpq: coarse clusters (probe `nprobe` of them),
+# ivfpq and pq: product-quantized codes of `pq_m` bytes per vector;
+# hnsw: graph search (`ef_search` candidates)
+INDEX_TYPES = ("flat", "ivf", "ivfpq", "pq", "hnsw")
+
+# fewest vectors a type can be trained and built on: one full IVF cluster
+# (see _nlist), two codes per PQ sub-quantizer, one HNSW node
+MIN_VECTORS = {"flat": 0, "ivf": 39, "ivfpq": 39, "pq": 2, "hnsw": 1}
+
+
+def _nlist(n: int, nlist: Optional[int]) -> int:
+    # ~sqrt(n) clusters, and at least 39 training points per cluster
+    wanted = nlist or int(4 * math.sqrt(n))
+    return max(1, min(wanted, n // 39))
+
+
+def _pq_m(dim: int, pq_m: int) -> int:
+    # sub-quantizers must split the dimension evenly
+    m = min(pq_m, dim)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def _pq_bits(n: int) -> int:
+    # 2**bits centroids per sub-quantizer need as many training points
+    return max(1, min(8, int(math.log2(max(n, 2)))))
+
+
+def factory_string(
+    kind: str,
+    n: int,
+    dim: int,
+    nlist: Optional[int] = None,
+    pq_m: int = 64,
+    hnsw_m: int = 32,
+) -> str:
+    if kind == "flat":
+        return "Flat"
+    if kind == "ivf":
+        return f"IVF{_nlist(n, nlist)},Flat"
+    if kind == "ivfpq":
+        return f"IVF{_nlist(n, nlist)},PQ{_pq_m(dim, pq_m)}x{_pq_bits(n)}"
+    if kind == "pq":
+        return f"PQ{_pq_m(dim, pq_m)}x{_pq_bits(n)}"
+    if kind == "hnsw":
+        return f"HNSW{hnsw_m}"
+    raise ValueError(f"unknown index type {kind!r}, expected one of {INDEX_TYPES}")
+
+
+def build_index(
+    vectors: np.ndarray,
+    kind: str,
+    train_size: int = 50_000,
+    seed: int = 0,
+    **params: Any,
+) -> faiss.Index:
+    """A `kind` index over `vectors` (L2), trained on a random sample of them."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    index = faiss.index_factory(dim, factory_string(kind, n, dim, **params))
+    if not index.is_trained:
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(n, min(n, train_size), replace=False)]
+        index.train(sample)
+    index.add(vectors)
+    return index
+
+
+def set_search_params(
+    index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None
+) -> faiss.Index:
+    """Apply query-time knobs; also lets IVF indexes reconstruct vectors (MMR)."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        if nprobe:
+            ivf.nprobe = nprobe
+        ivf.make_direct_map()
+    if ef_search and isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+    return index
+
+
+def index_bytes(index: faiss.Index) -> int:
+    return int(faiss.serialize_index(index).size)
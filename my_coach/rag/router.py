@@ -0,0 +1,308 @@
+import logging
+import pathlib
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+from my_coach.config import settings
+from .bm25 import BM25Index
+from .chunk_store import load_faiss
+
+logger = logging.getLogger(__name__)
+
+# shards searched only when the query mentions them; any other shard
+# (training_science, general, ...) is general guidance and always searched.
+# Words of up to 4 letters must match whole, longer ones are stems.
+SHARD_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "injury": (
+        "injur", "pain", "rehab", "tendin", "tendon", "fracture", "sprain",
+        "knee", "knees", "achilles", "shin", "shins", "plantar", "hamstring",
+        "itb", "hip", "ankle", "physio", "overuse", "niggle",
+    ),
+    "heat": (
+        "heat", "hot", "humid", "temperature", "climate", "summer", "tropic",
+        "acclimat", "thermal", "sweat", "desert",
+    ),
+    "nutrition": (
+        "nutri", "fuel", "carbs", "carbohydrate", "diet", "food", "protein",
+        "hydrat", "drink", "gel", "gels", "caffeine", "weight loss",
+        "energy availab", "supplement", "meal", "vegan", "vegetarian",
+    ),
+}  # fmt: skip
+
+
+def _pattern(words: Tuple[str, ...]) -> "re.Pattern[str]":
+    parts = [
+        rf"\b{re.escape(w)}\b" if len(w) <= 4 else rf"\b{re.escape(w)}" for w in words
+    ]
+    return re.compile("|".join(parts))
+
+
+def _key(doc: Document) -> str:
+    return doc.id or doc.page_content
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Document]], k: int = 4, c: int = 60
+) -> List[Document]:
+    """Merge rankings by summed 1 / (c + rank); needs no comparable scores."""
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = _key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (c + rank)
+            docs.setdefault(key, doc)
+    best = sorted(scores, key=scores.__getitem__, reverse=True)[:k]
+    return [docs[key] for key in best]
+
+
+def _tagged(docs: List[Document], mode: str) -> List[Document]:
+    # copies: the in-memory docstore of a writable index hands out its own
+    return [
+        Document(
+            id=d.id,
+            page_content=d.page_content,
+            metadata={**d.metadata, "retrieval": mode},
+        )
+        for d in docs
+    ]
+
+
+class ShardRouter:
+    """Category shards of the chunk index, searched in parallel and merged.
+
+    Scores are FAISS distances in one shared embedding space, so the shards'
+    hits can be merged by score directly.
+
+    Shards with a BM25 index in `lexical` are also searched by keyword while
+    the queries are being embedded, and the two rankings are fused by reciprocal
+    rank. If the embedding is not back within `vector_budget_s` (or fails),
+    the lexical ranking is returned alone. Every returned document carries
+    `metadata["retrieval"]`: "hybrid", "vector" or "lexical".
+
+    `normalize_L2` scales query vectors to unit length before searching, for
+    shards built from normalized vectors.
+    """
+
+    def __init__(
+        self,
+        shards: Dict[str, FAISS],
+        embeddings: Embeddings,
+        keywords: Optional[Dict[str, Tuple[str, ...]]] = None,
+        lexical: Optional[Dict[str, BM25Index]] = None,
+        vector_budget_s: Optional[float] = None,
+        rrf_k: int = 60,
+        normalize_L2: bool = False,
+    ):
+        self.shards = shards
+        self.embeddings = embeddings
+        self.lexical = lexical or {}
+        self.vector_budget_s = vector_budget_s
+        self.rrf_k = rrf_k
+        self.normalize_L2 = normalize_L2
+        keywords = SHARD_KEYWORDS if keywords is None else keywords
+        self._patterns = {name: _pattern(words) for name, words in keywords.items()}
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, len(shards)), thread_name_prefix="shard"
+        )
+        # embedding calls left running past the budget still finish here
+        self._embed_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="embed")
+
+    @property
+    def ntotal(self) -> int:
+        return sum(vs.index.ntotal for vs in self.shards.values())
+
+    def route(self, query: str) -> List[str]:
+        text = query.lower()
+        picked = [
+            name
+            for name in self.shards
+            if name not in self._patterns or self._patterns[name].search(text)
+        ]
+        # nothing general and nothing mentioned: fall back to every shard
+        return picked or list(self.shards)
+
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        batch = getattr(self.embeddings, "embed_queries", None)
+        if batch is not None:
+            return batch(queries)
+        return [self.embeddings.embed_query(q) for q in queries]
+
+    def _search_shard(
+        self, name: str, vectors: np.ndarray, n: int, with_vectors: bool
+    ) -> List[List[Tuple[Document, float, Optional[np.ndarray]]]]:
+        # one FAISS call for every query routed to this shard
+        vs = self.shards[name]
+        if self.normalize_L2:
+            vectors = vectors.copy()
+            faiss.normalize_L2(vectors)
+        scores, rows = vs.index.search(vectors, n)
+        return [
+            [
+                (
+                    vs.docstore.search(vs.index_to_docstore_id[int(row)]),
+                    float(score),
+                    vs.index.reconstruct(int(row)) if with_vectors else None,
+                )
+                for score, row in zip(q_scores, q_rows)
+                if row != -1
+            ]
+            for q_scores, q_rows in zip(scores, rows)
+        ]
+
+    def search_by_vectors(
+        self,
+        embeddings: List[List[float]],
+        routes: List[List[str]],
+        k: int = 4,
+        fetch_k: int = 20,
+        search_type: str = "mmr",
+    ) -> List[List[Tuple[Document, float]]]:
+        """Top `k` hits of each query vector over the shards in its route.
+
+        With MMR, the `fetch_k` nearest chunks across all routed shards are
+        gathered first and MMR picks `k` of them once, so diversity holds
+        across shards and not just within each.
+        """
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        mmr = search_type == "mmr"
+        per_shard = {
+            name: [i for i, route in enumerate(routes) if name in route]
+            for name in self.shards
+        }
+        per_shard = {name: qs for name, qs in per_shard.items() if qs}
+
+        def one(name: str) -> List[List[Tuple[Document, float, Optional[np.ndarray]]]]:
+            qs = per_shard[name]
+            return self._search_shard(name, vectors[qs], fetch_k if mmr else k, mmr)
+
+        hits: List[List[Tuple[Document, float, Optional[np.ndarray]]]] = [
+            [] for _ in routes
+        ]
+        # faiss releases the GIL while scanning: threads run the shards in parallel
+        for name, part in zip(per_shard, self._pool.map(one, per_shard)):
+            for q, q_hits in zip(per_shard[name], part):
+                hits[q].extend(q_hits)
+
+        out = []
+        for query, q_hits in zip(vectors, hits):
+            q_hits.sort(key=lambda h: h[1])
+            if mmr and q_hits:
+                candidates = q_hits[:fetch_k]
+                # as FAISS.max_marginal_relevance_search_with_score_by_vector
+                chosen = maximal_marginal_relevance(
+                    query[None, :], [v for _, _, v in candidates], k=k
+                )
+                q_hits = [candidates[j] for j in chosen]
+            out.append([(doc, score) for doc, score, _ in q_hits[:k]])
+        return out
+
+    def search_lexical(
+        self, query: str, shards: List[str], k: int = 4
+    ) -> List[Tuple[Document, float]]:
+        # BM25 scores use per-shard idf: close enough to merge across shards
+        hits = []
+        for name in shards:
+            bm25 = self.lexical.get(name)
+            if bm25 is None:
+                continue
+            vs = self.shards[name]
+            for row, score in bm25.search(query, k):
+                doc = vs.docstore.search(vs.index_to_docstore_id[row])
+                hits.append((doc, score))
+        hits.sort(key=lambda h: -h[1])
+        return hits[:k]
+
+    def search_many(
+        self,
+        queries: List[str],
+        k: int = 4,
+        fetch_k: int = 20,
+        search_type: str = "mmr",
+    ) -> List[Document]:
+        """Up to `k` chunks for several sub-queries together, deduplicated.
+
+        The queries are embedded in one call and searched as one batch per
+        shard; their rankings are fused by reciprocal rank, so each query's
+        best chunk comes before any query's second best. Earlier queries
+        win ties.
+        """
+        routes = [self.route(q) for q in queries]
+        pending = self._embed_pool.submit(self._embed_queries, queries)
+        # each leg brings 2k candidates so fusion has overlap to work with
+        lexical = [
+            [doc for doc, _ in self.search_lexical(q, route, 2 * k)]
+            for q, route in zip(queries, routes)
+        ]
+        matched = any(lexical)
+        try:
+            # nothing matched by keyword: the vector leg is the only answer
+            embeddings = pending.result(self.vector_budget_s if matched else None)
+        except Exception as e:
+            if not matched:
+                raise
+            logger.warning("vector search skipped, lexical results only: %r", e)
+            return _tagged(reciprocal_rank_fusion(lexical, k, self.rrf_k), "lexical")
+
+        hits = self.search_by_vectors(
+            embeddings, routes, 2 * k if matched else k, fetch_k, search_type
+        )
+        vector = [[doc for doc, _ in q_hits] for q_hits in hits]
+        if not matched:
+            return _tagged(reciprocal_rank_fusion(vector, k, self.rrf_k), "vector")
+        rankings = [r for pair in zip(vector, lexical) for r in pair]
+        return _tagged(reciprocal_rank_fusion(rankings, k, self.rrf_k), "hybrid")
+
+    def search(
+        self, query: str, k: int = 4, fetch_k: int = 20, search_type: str = "mmr"
+    ) -> List[Document]:
+        return self.search_many([query], k, fetch_k, search_type)
+
+
+class ShardedRetriever(BaseRetriever):
+    router: ShardRouter
+    k: int = 4
+    fetch_k: int = 20
+    search_type: str = "mmr"
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.router.search(query, self.k, self.fetch_k, self.search_type)
+
+    def search_many(self, queries: List[str]) -> List[Document]:
+        return self.router.search_many(queries, self.k, self.fetch_k, self.search_type)
+
+
+def load_router(root: pathlib.Path, embeddings: Embeddings) -> ShardRouter:
+    """One shard per subdirectory of `root`, or `root` itself if unsharded."""
+    dirs = {
+        d.name: d
+        for d in sorted(root.iterdir())
+        if d.is_dir() and (d / "index.faiss").exists()
+    } or {"all": root}
+    lexical = {}
+    if settings.retrieval_hybrid:
+        lexical = {
+            name: BM25Index.load(d) for name, d in dirs.items() if BM25Index.exists(d)
+        }
+    return ShardRouter(
+        {name: load_faiss(d, embeddings) for name, d in dirs.items()},
+        embeddings,
+        lexical=lexical,
+        vector_budget_s=settings.retrieval_vector_budget_s,
+        rrf_k=settings.retrieval_rrf_k,
+    )
@@ -0,0 +1,89 @@
+"""Open time and resident memory: pickled docstore vs memory-mapped chunk store.
+
+Writes a synthetic index of `--chunks` chunks both ways into a temporary
+directory, then opens each in a fresh process and runs one search.
+
+    python my_coach/scripts/bench_chunk_store.py --chunks 50000 --dim 1024
+"""
+
+import argparse
+import pathlib
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+from my_coach.rag.chunk_store import save_faiss
+from my_coach.rag.embeddings import FakeEmbeddings
+
+_PROBE = """
+import pathlib, sys, time
+from langchain_community.vectorstores import FAISS
+from my_coach.rag.chunk_store import load_faiss
+from my_coach.rag.embeddings import FakeEmbeddings
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * 4096 / 2**20
+
+path, dim = pathlib.Path(sys.argv[1]), int(sys.argv[2])
+emb = FakeEmbeddings(size=dim)
+before = rss_mb()
+t0 = time.perf_counter()
+if (path / "index.pkl").exists():
+    # the pickled layout, as it was served before the chunk store
+    vs = FAISS.load_local(str(path), emb, allow_dangerous_deserialization=True)
+else:
+    vs = load_faiss(path, emb)
+t1 = time.perf_counter()
+vs.similarity_search("tempo run", k=4)
+t2 = time.perf_counter()
+print(f"{t1 - t0:.3f} {t2 - t1:.4f} {rss_mb() - before:.0f}")
+"""
+
+
+def _build(n: int, dim: int, root: pathlib.Path) -> None:
+    rng = np.random.default_rng(0)
+    words = np.array(["tempo", "easy", "interval", "recovery", "threshold", "long"])
+    texts = [" ".join(rng.choice(words, 150)) for _ in range(n)]
+    vectors = rng.standard_normal((n, dim), dtype=np.float32)
+    metadatas = [
+        {"source": f"corpus/c/{i // 80}.pdf", "page": i // 8 % 10, "category": "c"}
+        for i in range(n)
+    ]
+    vs = FAISS.from_embeddings(
+        zip(texts, vectors.tolist()),
+        FakeEmbeddings(size=dim),
+        metadatas=metadatas,
+        ids=[f"chunk:{i}" for i in range(n)],
+    )
+    vs.save_local(str(root / "pickled"))
+    save_faiss(vs, root / "mmapped")
+
+
+def _probe(path: pathlib.Path, dim: int) -> str:
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE, str(path), str(dim)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return out.stdout.split()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", type=int, default=50_000)
+    ap.add_argument("--dim", type=int, default=1024)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = pathlib.Path(tmp)
+        _build(args.chunks, args.dim, root)
+        print(f"{args.chunks} chunks, dim {args.dim}")
+        print(f"{'':10s}{'open s':>10s}{'search s':>10s}{'RSS MB':>10s}")
+        for name in ("pickled", "mmapped"):
+            open_s, search_s, rss = _probe(root / name, args.dim)
+            print(f"{name:10s}{open_s:>10s}{search_s:>10s}{rss:>10s}")
@@ -0,0 +1,73 @@
+"""Prompt tokens of the RAG context: 8000-character slice vs compression.
+
+Chunks `--files` PDFs of corpus/, takes the top `--k` chunks per query set by
+BM25 (no embedding calls), and builds the context both ways. Coverage is the
+share of chunks still cited as [i] and the share of query terms found in the
+sliced context that the compressed one still contains.
+
+    python my_coach/scripts/bench_compression.py --files 40 --budget 1200
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from my_coach.config import settings
+from my_coach.llm.tokens import count_tokens
+from my_coach.rag.bm25 import BM25Index, tokenize
+from my_coach.rag.compress import compress_context
+from my_coach.scripts.ingest import chunk_file, corpus_files, file_sha256
+
+QUERIES = [
+    ["running training for marathon sub 3h", "running training with knee pain"],
+    ["cycling training for building an aerobic base", "cycling: indoor trainer only"],
+    ["trail training for 50k ultra", "trail: race in hot humid weather"],
+    ["triathlon training for half ironman", "triathlon training with 6 hours a week"],
+    ["running training for 10k in 45:00", "running: carbohydrate fueling on long runs"],
+]
+
+
+def _terms(text: str) -> set:
+    return set(tokenize(text))
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=40)
+    ap.add_argument("--k", type=int, default=4)
+    ap.add_argument("--budget", type=int, default=settings.rag_context_tokens)
+    args = ap.parse_args()
+
+    files = list(corpus_files().items())[: args.files]
+    chunks = [
+        c.page_content for rel, p in files for c in chunk_file(rel, p, file_sha256(p))
+    ]
+    bm25 = BM25Index.build(chunks)
+    print(f"{len(chunks)} chunks from {len(files)} files, budget {args.budget} tokens")
+
+    rows = []
+    for queries in QUERIES:
+        query = " ".join(queries)
+        top = [chunks[r] for r, _ in bm25.search(query, args.k)]
+        sliced = "\n\n".join(f"[{i}] {t}" for i, t in enumerate(top, 1))[:8000]
+        t0 = time.perf_counter()
+        packed = compress_context(top, query, args.budget)
+        ms = (time.perf_counter() - t0) * 1e3
+
+        cited = sum(f"[{i}] " in packed for i in range(1, len(top) + 1))
+        wanted = _terms(query) & _terms(sliced)
+        kept = len(wanted & _terms(packed)) / len(wanted) if wanted else 1.0
+        rows.append(
+            (count_tokens(sliced), count_tokens(packed), cited / len(top), kept, ms)
+        )
+        print(
+            f"{queries[0][:40]:40s} {rows[-1][0]:6d} -> {rows[-1][1]:5d} tokens, "
+            f"cited {cited}/{len(top)}, query terms kept {kept:.0%}, {ms:.1f} ms"
+        )
+
+    raw, packed, cited, kept, ms = np.mean(rows, axis=0)
+    print(
+        f"mean: {raw:.0f} -> {packed:.0f} tokens ({1 - packed / raw:.0%} fewer), "
+        f"cited {cited:.0%}, query terms kept {kept:.0%}, {ms:.1f} ms"
+    )
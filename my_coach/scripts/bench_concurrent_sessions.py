@@ -0,0 +1,90 @@
+"""N chat sessions against one graph, with stubbed LLMs that just sleep.
+
+Runs the discuss path (modify router + discuss reply) for N threads, first the
+old way (sync `graph.stream` inside async handlers, which blocks the loop) and
+then with `graph.astream`, where the sessions interleave on one event loop.
+
+    python my_coach/scripts/bench_concurrent_sessions.py --sessions 20 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import START
+
+# the tool modules read their keys at import time
+os.environ.setdefault("GARTH_TOKEN", "stub")
+os.environ.setdefault("TAVILY_API_KEY", "stub")
+
+from my_coach.domain.shemas import ModifyRoute  # noqa: E402
+from my_coach.graph import build_graph  # noqa: E402
+
+
+def _stub_llm(latency: float, make):
+    def run(_input, **_kw):
+        time.sleep(latency)
+        return make()
+
+    async def arun(_input, **_kw):
+        await asyncio.sleep(latency)
+        return make()
+
+    return RunnableLambda(run, afunc=arun)
+
+
+def _stub_llms(latency: float):
+    small = _stub_llm(latency, lambda: AIMessage(content="Looks good!"))
+    return {
+        "llm_small": small,
+        "llm_coach": small,
+        "llm_modify": _stub_llm(latency, lambda: ModifyRoute(mode="continue")),
+    }
+
+
+def _config(i: int):
+    return {"configurable": {"thread_id": f"bench-{i}"}}
+
+
+_SEED = {
+    "start_route": "discuss",
+    "plan": [{"Date": "01-09-2025", "Description": "10 km easy"}],
+}
+_TURN = {"messages": [{"role": "user", "content": "How is my week?"}]}
+
+
+async def _sync_session(graph, i: int) -> None:
+    graph.update_state(_config(i), values=_SEED, as_node=START)
+    for _ in graph.stream(_TURN, stream_mode="messages", config=_config(i)):
+        pass
+
+
+async def _async_session(graph, i: int) -> None:
+    await graph.aupdate_state(_config(i), values=_SEED, as_node=START)
+    async for _ in graph.astream(_TURN, stream_mode="messages", config=_config(i)):
+        pass
+
+
+async def _timed(runner, sessions: int, latency: float) -> float:
+    graph = build_graph(_stub_llms(latency))
+    t0 = time.perf_counter()
+    await asyncio.gather(*(runner(graph, i) for i in range(sessions)))
+    return time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=10)
+    ap.add_argument("--latency", type=float, default=0.3, help="seconds per LLM call")
+    args = ap.parse_args()
+
+    one = asyncio.run(_timed(_async_session, 1, args.latency))
+    blocking = asyncio.run(_timed(_sync_session, args.sessions, args.latency))
+    interleaved = asyncio.run(_timed(_async_session, args.sessions, args.latency))
+
+    print(f"1 session (astream)              : {one:6.2f} s")
+    print(f"{args.sessions} sessions, sync stream       : {blocking:6.2f} s")
+    print(f"{args.sessions} sessions, astream           : {interleaved:6.2f} s")
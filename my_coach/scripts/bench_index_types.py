@@ -0,0 +1,92 @@
+"""Memory, build time, query latency and recall@k of each index type vs flat.
+
+Runs on clustered synthetic vectors, or on the vectors of a built shard
+(`--index-dir data/index_faiss/training_science`). Queries are perturbed
+copies of indexed vectors; recall@k is the overlap with the exact top k.
+
+    python my_coach/scripts/bench_index_types.py --n 20000 --dim 1024
+"""
+
+import argparse
+import pathlib
+import time
+
+import faiss
+import numpy as np
+
+from my_coach.rag.index_types import (
+    INDEX_TYPES,
+    build_index,
+    index_bytes,
+    set_search_params,
+)
+
+
+def _synthetic(n: int, dim: int, clusters: int = 64) -> np.ndarray:
+    # embeddings of a topical corpus sit in clumps, not uniformly on the sphere
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    vectors = centers[rng.integers(clusters, size=n)]
+    vectors += 0.5 * rng.standard_normal((n, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _queries(vectors: np.ndarray, count: int) -> np.ndarray:
+    rng = np.random.default_rng(1)
+    picked = vectors[rng.choice(len(vectors), count, replace=False)]
+    noise = 0.05 * rng.standard_normal(picked.shape, dtype=np.float32)
+    return np.ascontiguousarray(picked + noise, dtype=np.float32)
+
+
+def _search(index: faiss.Index, queries: np.ndarray, k: int):
+    # one query at a time, as the retriever issues them
+    t0 = time.perf_counter()
+    ids = np.vstack([index.search(q[None, :], k)[1] for q in queries])
+    return ids, (time.perf_counter() - t0) / len(queries)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=20_000)
+    ap.add_argument("--dim", type=int, default=1024)
+    ap.add_argument("--index-dir", type=pathlib.Path, default=None)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--nprobe", type=int, default=8)
+    ap.add_argument("--ef-search", type=int, default=64)
+    ap.add_argument("--pq-m", type=int, default=64)
+    ap.add_argument("--hnsw-m", type=int, default=32)
+    args = ap.parse_args()
+
+    if args.index_dir is not None:
+        flat = faiss.read_index(str(args.index_dir / "index.faiss"))
+        vectors = flat.reconstruct_n(0, flat.ntotal)
+    else:
+        vectors = _synthetic(args.n, args.dim)
+    queries = _queries(vectors, min(args.queries, len(vectors)))
+    print(f"{len(vectors)} vectors, dim {vectors.shape[1]}, {len(queries)} queries")
+
+    truth = None
+    print(
+        f"{'type':8s}{'MB':>9s}{'build s':>10s}{'query ms':>10s}"
+        f"{f'recall@{args.k}':>11s}"
+    )
+    for kind in INDEX_TYPES:
+        params = {"flat": {}, "ivf": {}, "hnsw": {"hnsw_m": args.hnsw_m}}.get(
+            kind, {"pq_m": args.pq_m}
+        )
+        t0 = time.perf_counter()
+        index = build_index(vectors, kind, **params)
+        build_s = time.perf_counter() - t0
+        set_search_params(index, nprobe=args.nprobe, ef_search=args.ef_search)
+
+        ids, latency = _search(index, queries, args.k)
+        if truth is None:
+            truth = ids  # flat comes first: the exact answer
+        recall = np.mean(
+            [len(set(a) & set(b)) / args.k for a, b in zip(ids.tolist(), truth)]
+        )
+        print(
+            f"{kind:8s}{index_bytes(index) / 2**20:9.1f}{build_s:10.2f}"
+            f"{latency * 1e3:10.3f}{recall:11.3f}"
+        )
@@ -0,0 +1,73 @@
+"""Serial vs parallel ingest of `corpus/`, with a local fake embedding model.
+
+The serial path is the original one: parse every PDF in turn, then embed all
+chunks with one blocking `embed_documents` call. The parallel path parses in a
+process pool and keeps `--concurrency` embedding batches in flight. Nothing is
+written to `data/`.
+
+    python my_coach/scripts/bench_ingest.py --workers 8 --latency 0.2
+"""
+
+import argparse
+import time
+
+from langchain_community.vectorstores import FAISS
+
+from my_coach.rag.embeddings import BatchEmbedder, FakeEmbeddings
+from my_coach.scripts.ingest import (
+    chunk_file,
+    corpus_files,
+    embed_chunks,
+    file_sha256,
+    parse_files,
+)
+
+
+def _jobs():
+    return [(rel, p, file_sha256(p)) for rel, p in corpus_files().items()]
+
+
+def serial(jobs, emb: FakeEmbeddings):
+    t0 = time.perf_counter()
+    chunks = [c for job in jobs for c in chunk_file(*job)]
+    t1 = time.perf_counter()
+    FAISS.from_documents(chunks, emb)
+    return len(chunks), t1 - t0, time.perf_counter() - t1
+
+
+def parallel(jobs, emb: FakeEmbeddings, workers: int, batch: int, concurrency: int):
+    t0 = time.perf_counter()
+    parsed = parse_files(jobs, workers)
+    chunks = [c for job in jobs for c in parsed[job[0]]]
+    t1 = time.perf_counter()
+    embed_chunks(chunks, BatchEmbedder(emb, batch_size=batch, concurrency=concurrency))
+    return len(chunks), t1 - t0, time.perf_counter() - t1
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--batch-size", type=int, default=64)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument(
+        "--latency", type=float, default=0.2, help="seconds per embedding request"
+    )
+    args = ap.parse_args()
+
+    jobs = _jobs()
+    emb = FakeEmbeddings(latency_s=args.latency, request_size=args.batch_size)
+
+    n, parse_s, embed_s = serial(jobs, emb)
+    n2, pparse_s, pembed_s = parallel(
+        jobs, emb, args.workers, args.batch_size, args.concurrency
+    )
+    assert n == n2
+
+    print(f"{len(jobs)} files -> {n} chunks")
+    print(f"{'':10s}{'parse':>10s}{'embed':>10s}{'total':>10s}")
+    print(f"{'serial':10s}{parse_s:10.2f}{embed_s:10.2f}{parse_s + embed_s:10.2f}")
+    print(
+        f"{'parallel':10s}{pparse_s:10.2f}{pembed_s:10.2f}"
+        f"{pparse_s + pembed_s:10.2f}"
+    )
+    print(f"speedup   {(parse_s + embed_s) / (pparse_s + pembed_s):.1f}x")
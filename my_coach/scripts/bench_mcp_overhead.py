@@ -0,0 +1,69 @@
+"""Per-call dispatch overhead of MCPTool._run, before and after the shared loop.
+
+Both variants run the same no-op coroutine so only the sync -> async bridge is
+measured (thread + event loop per call vs. one long-lived background loop).
+
+    python my_coach/scripts/bench_mcp_overhead.py --calls 2000
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import statistics
+import time
+
+from my_coach.mcp.loop import run_async, run_sync
+
+
+async def _noop() -> str:
+    await asyncio.sleep(0)
+    return ""
+
+
+def _legacy_run() -> str:
+    # what MCPTool._run did when called from inside a running loop
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as ex:
+        return ex.submit(lambda: asyncio.run(_noop())).result()
+
+
+def _shared_loop_run() -> str:
+    return run_sync(_noop())
+
+
+def _time_sync(fn, calls: int) -> list[float]:
+    samples = []
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+async def _time_async(calls: int) -> list[float]:
+    samples = []
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        await run_async(_noop())
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def _report(name: str, samples: list[float]) -> None:
+    us = sorted(s * 1e6 for s in samples)
+    p95 = us[int(0.95 * (len(us) - 1))]
+    print(
+        f"{name:<28} mean {statistics.fmean(us):8.1f} us   "
+        f"p50 {statistics.median(us):8.1f} us   p95 {p95:8.1f} us"
+    )
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls", type=int, default=1000)
+    args = ap.parse_args()
+
+    run_sync(_noop())  # start the background loop outside the timings
+
+    _report("thread + asyncio.run", _time_sync(_legacy_run, args.calls))
+    _report("shared loop (run_sync)", _time_sync(_shared_loop_run, args.calls))
+    _report("shared loop (run_async)", asyncio.run(_time_async(args.calls)))
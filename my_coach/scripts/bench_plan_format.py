@@ -0,0 +1,76 @@
+"""Prompt tokens of a training plan per encoding, for plans of 28 and 200 sessions.
+
+"repr" is how the plan used to reach the discuss prompt (f"{plan}") and
+"json_items" how it reached the summary prompt (one model_dump_json() per
+item); "rows" and "weeks" are the encodings of my_coach/llm/plan_format.py.
+
+    python my_coach/scripts/bench_plan_format.py --sessions 28 200
+"""
+
+import argparse
+import json
+import random
+from datetime import date, timedelta
+
+from my_coach.domain.shemas import TrainingItem
+from my_coach.llm.plan_format import ENCODINGS
+from my_coach.llm.tokens import count_tokens
+
+DESCRIPTIONS = [
+    "Run: 15' easy warm-up; 5x1 km at 10k pace (RPE 7) with 2' jog; 10' cool-down.",
+    "Bike: 90' endurance ride in Z2 (65-75% FTP), cadence 85-95, fuel 60 g carbs/h.",
+    "Run: 60' easy in Z1-Z2 on soft surface, finish with 6x20'' strides, full recovery.",
+    "Swim: 400 m easy; 8x100 m at CSS pace, 15'' rest; 200 m pull; 200 m easy.",
+    "Trail: 2h long run with 600 m climbing, hike the steep parts, practise fueling.",
+    "Run: 20' warm-up; 25' tempo at threshold (HR 165-172); 10' cool-down.",
+    "Bike: 15' warm-up; 3x12' sweet spot (88-93% FTP), 5' easy between; 10' spin.",
+]
+
+
+def plan_of(n: int, seed: int = 0) -> list:
+    """`n` sessions over 5 days of each week, as the coach would return them."""
+    rng = random.Random(seed)
+    start = date(2025, 9, 1)
+    days = [start + timedelta(days=i) for i in range(n * 7 // 5 + 7)]
+    days = [d for d in days if d.weekday() not in (0, 4)][:n]
+    return [TrainingItem(Date=d, Description=rng.choice(DESCRIPTIONS)) for d in days]
+
+
+def baselines(plan: list) -> dict:
+    return {
+        "repr": f"{plan}",
+        "json_items": json.dumps(
+            [item.model_dump_json() for item in plan], ensure_ascii=False
+        ),
+        "json": json.dumps(
+            [
+                {
+                    "Date": item.Date.strftime("%d-%m-%Y"),
+                    "Description": item.Description,
+                }
+                for item in plan
+            ],
+            ensure_ascii=False,
+        ),
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, nargs="+", default=[28, 200])
+    args = ap.parse_args()
+
+    for n in args.sessions:
+        plan = plan_of(n)
+        texts = baselines(plan)
+        texts.update({name: encode(plan) for name, encode in ENCODINGS.items()})
+        floor = count_tokens("\n".join(item.Description for item in plan))
+        base = count_tokens(texts["repr"])
+
+        print(f"{n} sessions (descriptions alone: {floor} tokens)")
+        for name, text in texts.items():
+            tokens = count_tokens(text)
+            print(
+                f"  {name:10s} {tokens:6d} tokens  {tokens / base:5.0%} of repr  "
+                f"{(tokens - floor) / n:5.1f} tokens/session overhead"
+            )
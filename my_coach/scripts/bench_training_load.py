@@ -0,0 +1,86 @@
+"""Training-load analytics on synthetic multi-year histories.
+
+Times the full CTL/ATL/TSB/ACWR computation, an incremental update with one new
+day (the common case after a delta sync), and the whole `_get_fitness_summary`.
+
+    python my_coach/scripts/bench_training_load.py --years 10 --per-day 2
+"""
+
+import argparse
+import os
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+os.environ.setdefault("GARTH_TOKEN", "stub")
+os.environ.setdefault("TAVILY_API_KEY", "stub")
+
+from my_coach.graph.training_load import (  # noqa: E402
+    TrainingLoadModel,
+    compute,
+    daily_load,
+)
+from my_coach.graph.utils import _get_fitness_summary  # noqa: E402
+
+
+def _activities(years: int, per_day: int, seed: int = 0) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    start = date.today() - timedelta(days=365 * years)
+    out = []
+    for d in range(365 * years):
+        day = start + timedelta(days=d)
+        for _ in range(rng.binomial(per_day, 0.7)):
+            minutes = float(rng.integers(30, 150))
+            out.append(
+                {
+                    "activityId": len(out),
+                    "startTimeLocal": f"{day:%Y-%m-%d} 07:00:00",
+                    "activityType": {"typeKey": rng.choice(["running", "cycling"])},
+                    "distance": minutes * rng.uniform(150, 450),
+                    "duration": minutes * 60,
+                    "intensityFactor": rng.uniform(0.6, 0.95),
+                }
+            )
+    return out
+
+
+def _best_of(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--years", type=int, default=5)
+    ap.add_argument("--per-day", type=int, default=2)
+    args = ap.parse_args()
+
+    acts = _activities(args.years, args.per_day)
+    loads = daily_load(acts)
+    print(f"{len(acts)} activities over {len(loads)} days")
+
+    print(
+        f"daily_load               : {_best_of(lambda: daily_load(acts)) * 1e3:8.2f} ms"
+    )
+    print(
+        f"full compute             : {_best_of(lambda: compute(loads)) * 1e3:8.2f} ms"
+    )
+
+    def one_new_day():
+        model = TrainingLoadModel()
+        model.frame = compute(loads.iloc[:-1])
+        t0 = time.perf_counter()
+        model.update(loads.iloc[-90:])
+        return time.perf_counter() - t0
+
+    inc = min(one_new_day() for _ in range(5))
+    print(f"incremental (+1 day)     : {inc * 1e3:8.2f} ms")
+
+    model = TrainingLoadModel()
+    summary = _best_of(lambda: _get_fitness_summary(acts, load_model=model))
+    print(f"_get_fitness_summary     : {summary * 1e3:8.2f} ms")
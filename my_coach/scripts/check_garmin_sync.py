@@ -0,0 +1,112 @@
+"""Check that repeated Garmin fetches only ask the MCP server for uncovered days.
+
+Points the Garmin tool at scripts/stub_mcp_server.py, which records every
+`snapshot` call, and runs afetch_activities over overlapping, covered and
+later windows against a fresh ActivityStore. Exits non-zero on the first mismatch.
+
+    python my_coach/scripts/check_garmin_sync.py
+"""
+
+import asyncio
+import os
+import pathlib
+import sys
+import tempfile
+from datetime import date
+
+os.environ.setdefault("GARTH_TOKEN", "stub")
+
+from my_coach.config import settings  # noqa: E402
+from my_coach.mcp import garmin_store  # noqa: E402
+from my_coach.mcp.client import MCPTool  # noqa: E402
+from my_coach.mcp.mcp_garmin import SnapshotArgs  # noqa: E402
+
+STUB = pathlib.Path(__file__).with_name("stub_mcp_server.py")
+sys.path.insert(0, str(STUB.parent))
+
+from stub_mcp_server import read_calls  # noqa: E402
+
+
+def stub_tool(log: str) -> MCPTool:
+    return MCPTool(
+        name="garmin",
+        description="Stub Garmin snapshot",
+        cmd=sys.executable,
+        mcp_args=[str(STUB)],
+        mcp_tool_name="snapshot",
+        args_schema=SnapshotArgs,
+        env={"STUB_MCP_LOG": log},
+    )
+
+
+def expect(label: str, log: str, ranges: list) -> None:
+    calls = sorted(
+        (c["arguments"]["from_date"], c["arguments"]["to_date"])
+        for c in read_calls(log)
+        if c["tool"] == "snapshot"
+    )
+    want = sorted((a.isoformat(), b.isoformat()) for a, b in ranges)
+    status = "ok" if calls == want else "FAIL"
+    print(f"{status:4s} {label}: asked for {calls}")
+    if calls != want:
+        print(f"     expected {want}")
+        sys.exit(1)
+    if os.path.exists(log):
+        os.remove(log)
+
+
+async def main(tmp: pathlib.Path) -> None:
+    log = str(tmp / "calls.jsonl")
+    garmin_store.garmin_tool = stub_tool(log)
+    store = garmin_store.ActivityStore(tmp / "activities.sqlite")
+    chunk = settings.garmin_chunk_days
+
+    async def fetch(a: date, b: date) -> int:
+        return len(await garmin_store.afetch_activities(a, b, store))
+
+    n = await fetch(date(2025, 1, 1), date(2025, 3, 31))
+    expect(
+        "cold cache",
+        log,
+        garmin_store._chunks([(date(2025, 1, 1), date(2025, 3, 31))], chunk),
+    )
+    assert n == 90, n
+
+    # the last synced day is fetched again: it may have been partial
+    n = await fetch(date(2025, 1, 1), date(2025, 4, 20))
+    expect("extended window", log, [(date(2025, 3, 31), date(2025, 4, 20))])
+    assert n == 110, n
+
+    n = await fetch(date(2025, 2, 1), date(2025, 2, 28))
+    expect("covered window", log, [])
+    assert n == 28, n
+
+    # a later window also asks for the days between it and the synced range
+    n = await fetch(date(2025, 6, 1), date(2025, 6, 10))
+    expect(
+        "later window",
+        log,
+        garmin_store._chunks([(date(2025, 4, 20), date(2025, 6, 10))], chunk),
+    )
+    assert n == 10, n
+    assert store.coverage() == (date(2025, 1, 1), date(2025, 6, 10)), store.coverage()
+
+    n = await fetch(date(2024, 12, 1), date(2025, 6, 10))
+    expect(
+        "earlier window",
+        log,
+        garmin_store._chunks(
+            [
+                (date(2024, 12, 1), date(2024, 12, 31)),
+                (date(2025, 6, 10), date(2025, 6, 10)),
+            ],
+            chunk,
+        ),
+    )
+    assert n == 192, n
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(main(pathlib.Path(tmp)))
+    print("ok")
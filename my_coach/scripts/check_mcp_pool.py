@@ -0,0 +1,134 @@
+"""Check MCPSessionPool against scripts/stub_mcp_server.py.
+
+Concurrent callers must share one server per (cmd, args, env) key, a session
+left unused past `mcp_health_check_interval_s` is pinged before reuse, a
+server that died between calls is restarted with exactly one transparent
+retry, a call that kills its server is retried once and then raises, and an
+idle session shuts its server down after `mcp_idle_timeout_s` (both set short
+here). Exits non-zero on the first failed check.
+
+    python my_coach/scripts/check_mcp_pool.py --concurrency 8
+"""
+
+import argparse
+import asyncio
+import os
+import pathlib
+import signal
+import sys
+import tempfile
+
+os.environ.setdefault("GARTH_TOKEN", "stub")
+
+from mcp.shared.exceptions import McpError  # noqa: E402
+
+from my_coach.config import settings  # noqa: E402
+from my_coach.mcp.pool import MCPSessionPool, _pool_key  # noqa: E402
+
+STUB = pathlib.Path(__file__).with_name("stub_mcp_server.py")
+sys.path.insert(0, str(STUB.parent))
+
+from stub_mcp_server import read_calls  # noqa: E402
+
+
+def check(label: str, ok: bool, detail: object = "") -> None:
+    print(f"{'ok' if ok else 'FAIL':4s} {label} {detail}".rstrip())
+    if not ok:
+        sys.exit(1)
+
+
+def calls(log: str, tool: str) -> list:
+    return [c for c in read_calls(log) if c["tool"] == tool]
+
+
+async def main(log: str, concurrency: int) -> None:
+    pool = MCPSessionPool()
+    cmd, args, env = sys.executable, [str(STUB)], {"STUB_MCP_LOG": log}
+    key = _pool_key(cmd, args, env)
+
+    # call_tool discards a session once per retry: count them
+    discards = []
+    discard = pool._discard
+
+    async def counted_discard(key, pooled):
+        discards.append(pooled)
+        await discard(key, pooled)
+
+    pool._discard = counted_discard
+
+    async def call(tool: str, **arguments):
+        return await pool.call_tool(cmd, args, env, tool, arguments, timeout_s=30)
+
+    day = {"from_date": "2025-01-01", "to_date": "2025-01-01"}
+    await asyncio.gather(*(call("snapshot", **day) for _ in range(concurrency)))
+    pids = {c["pid"] for c in calls(log, "snapshot")}
+    check(
+        f"{concurrency} concurrent calls share one server",
+        len(calls(log, "start")) == 1 and len(pids) == 1 and len(pool._sessions) == 1,
+        f"(starts={len(calls(log, 'start'))}, pids={len(pids)})",
+    )
+
+    pooled = pool._sessions[key]
+    checked = pooled.last_checked
+    await asyncio.sleep(settings.mcp_health_check_interval_s * 1.5)
+    await call("snapshot", **day)
+    check(
+        "unused session is pinged before reuse",
+        pooled.last_checked > checked and pool._sessions[key] is pooled,
+    )
+
+    # killed between calls: the next call hits a dead transport and retries once
+    os.kill(pids.pop(), signal.SIGKILL)
+    before = len(calls(log, "snapshot"))
+    result = await call("snapshot", **day)
+    check(
+        "dead server is restarted with one transparent retry",
+        not result.isError
+        and len(calls(log, "start")) == 2
+        and len(calls(log, "snapshot")) == before + 1
+        and discards == [pooled]
+        and pool._sessions[key] is not pooled,
+    )
+
+    # the retry dies too: the last attempt's own error reaches the caller
+    try:
+        await call("crash")
+        raised = None
+    except McpError as e:
+        raised = e
+    check(
+        "crashing call is retried once, then raises",
+        raised is not None
+        and len(calls(log, "crash")) == 2
+        and len(discards) == 3
+        and len(calls(log, "start")) == 3
+        and key not in pool._sessions,
+        f"({raised!r})",
+    )
+
+    await call("snapshot", **day)
+    pooled = pool._sessions[key]
+    check("next call starts a fresh server", len(calls(log, "start")) == 4)
+
+    poll_s = max(0.05, min(settings.mcp_idle_timeout_s / 4, 5.0))
+    await asyncio.sleep(settings.mcp_idle_timeout_s + 2 * poll_s)
+    check(
+        f"idle session closes after {settings.mcp_idle_timeout_s}s",
+        not pooled.alive,
+    )
+    await pool.aclose()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--idle-timeout", type=float, default=2.0)
+    ap.add_argument("--health-check-interval", type=float, default=0.5)
+    a = ap.parse_args()
+    # the pool reads its defaults from settings, so the check does too
+    settings.mcp_idle_timeout_s = a.idle_timeout
+    settings.mcp_health_check_interval_s = a.health_check_interval
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(main(str(pathlib.Path(tmp) / "calls.jsonl"), a.concurrency))
+    print("ok")
@@ -1,18 +1,62 @@
+import argparse
+import hashlib
+import itertools
+import json
 import os
 import pathlib
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from dotenv import load_dotenv
-from typing import List
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
+import faiss
 from langchain_community.vectorstores import FAISS
 from langchain_community.document_loaders import DirectoryLoader, PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_mistralai import MistralAIEmbeddings
 from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+
+from my_coach.config import settings
+from my_coach.rag.chunk_store import (
+    ANN_INDEX,
+    ANN_INFO,
+    index_files,
+    index_stamp,
+    load_faiss,
+    save_faiss,
+)
+from my_coach.rag.dedup import (
+    SIGNATURES,
+    DedupStats,
+    NearDuplicateIndex,
+    load_signatures,
+    minhash,
+    save_signatures,
+)
+from my_coach.rag.embeddings import (
+    BatchEmbedder,
+    EmbedStats,
+    FakeEmbeddings,
+    cached,
+    get_embedding_cache,
+    model_id,
+)
+from my_coach.rag.index_types import (
+    INDEX_TYPES,
+    MIN_VECTORS,
+    build_index,
+    index_bytes,
+)
 
 
 ROOT = pathlib.Path(__file__).resolve().parents[2]
 CORPUS_DIR = ROOT / "corpus"
 INDEX_DIR = ROOT / "data" / "index_faiss"
+# --fake-embeddings output: hash vectors must never mix with real ones
+FAKE_INDEX_DIR = ROOT / "data" / "index_faiss_fake"
+MANIFEST = "manifest.json"
 
 load_dotenv(dotenv_path=(ROOT / ".env").expanduser())
 INDEX_DIR.parent.mkdir(parents=True, exist_ok=True)
@@ -47,17 +91,561 @@ def split_docs(docs: List[Document]) -> List[Document]:
     return splitter.split_documents(docs)
 
 
-def build_index(chunks: List[Document]):
-    emb = MistralAIEmbeddings(
-        model="mistral-embed", api_key=os.environ["MISTRAL_API_KEY"]
+def _embeddings(fake: bool = False) -> Embeddings:
+    if fake:
+        return cached(FakeEmbeddings())
+    return cached(
+        MistralAIEmbeddings(
+            model="mistral-embed", api_key=os.environ["MISTRAL_API_KEY"]
+        )
+    )
+
+
+# ---------- incremental ingest ----------
+
+
+def file_sha256(path: pathlib.Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def shard_of(rel: str) -> str:
+    """Shard of a corpus-relative path: its top-level folder (the category)."""
+    parts = pathlib.PurePosixPath(rel).parts
+    return parts[0] if len(parts) > 1 else "general"
+
+
+def corpus_files(shard: Optional[str] = None) -> Dict[str, pathlib.Path]:
+    files = {
+        p.relative_to(CORPUS_DIR).as_posix(): p
+        for p in sorted(CORPUS_DIR.glob("**/*.pdf"))
+    }
+    if shard is None:
+        return files
+    return {rel: p for rel, p in files.items() if shard_of(rel) == shard}
+
+
+def _read_manifest(index_dir: pathlib.Path) -> Dict[str, Any]:
+    path = index_dir / MANIFEST
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def load_manifest(index_dir: pathlib.Path) -> Dict[str, Dict]:
+    """{relative path: {"sha256": ..., "chunk_ids": [...], "duplicates": {...}}}
+    of the indexed files; "duplicates" maps each skipped chunk to the indexed
+    chunk it near-duplicates."""
+    return _read_manifest(index_dir).get("files", {})
+
+
+def manifest_embedding(index_dir: pathlib.Path) -> Optional[str]:
+    """`model_id` of the embeddings the index was built with, if recorded."""
+    return _read_manifest(index_dir).get("embedding")
+
+
+def save_manifest(files: Dict[str, Dict], index_dir: pathlib.Path, embedding: str):
+    path = index_dir / MANIFEST
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(
+        json.dumps({"version": 1, "embedding": embedding, "files": files}, indent=1)
+    )
+    # atomic: a crash never leaves a half-written manifest next to the index
+    tmp.replace(path)
+
+
+def chunk_file(rel: str, path: pathlib.Path, sha: str) -> List[Document]:
+    chunks = split_docs(enrich_metadata(PyPDFLoader(str(path)).load()))
+    # path + content: an unchanged file keeps its ids across runs
+    prefix = hashlib.sha256(f"{rel}\0{sha}".encode()).hexdigest()[:16]
+    for n, c in enumerate(chunks):
+        c.id = f"{prefix}:{n}"
+    return chunks
+
+
+def iter_parsed(
+    jobs: Iterable[Tuple[str, pathlib.Path, str]], workers: int = 1
+) -> Iterator[Tuple[str, List[Document]]]:
+    """(rel, chunks) of each (rel, path, sha) job, parsed in a process pool.
+
+    At most `2 * workers` files are in flight, so memory does not grow with
+    the corpus; results come in completion order.
+    """
+    jobs = iter(jobs)
+    done, t0 = 0, time.perf_counter()
+
+    def progress():
+        dt = time.perf_counter() - t0
+        print(f"[parse] {done} files ({done / dt:.1f} files/s)")
+
+    if workers <= 1:
+        for job in jobs:
+            chunks = chunk_file(*job)
+            done += 1
+            progress()
+            yield job[0], chunks
+        return
+
+    # PDF parsing is CPU-bound: processes, not threads
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        for job in itertools.islice(jobs, 2 * workers):
+            pending[pool.submit(chunk_file, *job)] = job[0]
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                rel = pending.pop(fut)
+                for job in itertools.islice(jobs, 1):
+                    pending[pool.submit(chunk_file, *job)] = job[0]
+                done += 1
+                progress()
+                yield rel, fut.result()
+
+
+def parse_files(
+    jobs: List[Tuple[str, pathlib.Path, str]], workers: int = 1
+) -> Dict[str, List[Document]]:
+    return dict(iter_parsed(jobs, workers))
+
+
+def _print_embed_progress(done: int, total: int, stats: EmbedStats) -> None:
+    print(
+        f"[embed] {done}/{total} chunks ({stats.throughput:.0f} chunks/s, "
+        f"{stats.retries} retries)"
+    )
+
+
+def embed_chunks(chunks: List[Document], embedder: BatchEmbedder) -> FAISS:
+    """A FAISS store over `chunks`, embedded in concurrent batches."""
+    texts = [c.page_content for c in chunks]
+    vectors = embedder.embed(texts)
+    return FAISS.from_embeddings(
+        list(zip(texts, vectors)),
+        embedder.embeddings,
+        metadatas=[c.metadata for c in chunks],
+        ids=[c.id for c in chunks],
+    )
+
+
+def load_index(
+    index_dir: pathlib.Path, embeddings: Optional[Embeddings] = None
+) -> Optional[FAISS]:
+    if not (index_dir / "index.faiss").exists() or not (index_dir / MANIFEST).exists():
+        return None
+    return load_faiss(index_dir, embeddings or _embeddings(), writable=True)
+
+
+def save_index(
+    vs: FAISS,
+    manifest: Dict[str, Dict],
+    index_dir: pathlib.Path,
+    embedding: str,
+    seen: Optional[NearDuplicateIndex] = None,
+) -> None:
+    """Checkpoint: the index first, then the manifest of the files it holds.
+
+    With `seen`, the MinHash signatures of the indexed chunks are saved too,
+    so the next run need not recompute them.
+    """
+    tmp = index_dir / ".tmp"
+    save_faiss(vs, tmp)
+    for src, dst in zip(index_files(tmp), index_files(index_dir)):
+        src.replace(dst)
+    if seen is not None:
+        save_signatures(tmp, seen.signatures())
+        (tmp / SIGNATURES).replace(index_dir / SIGNATURES)
+    shutil.rmtree(tmp, ignore_errors=True)
+    save_manifest(manifest, index_dir, embedding)
+
+
+def _with_dependents(manifest: Dict[str, Dict], gone: Iterable[str]) -> List[str]:
+    """`gone` plus the files whose skipped near-duplicates rely on their chunks.
+
+    Those files are re-ingested, so a duplicate comes back when the copy it
+    was skipped for goes away; transitively, as their own chunks are redone.
+    """
+    gone = set(gone)
+    lost = {i for rel in gone for i in manifest[rel]["chunk_ids"]}
+    while True:
+        more = {
+            rel
+            for rel, entry in manifest.items()
+            if rel not in gone
+            and lost.intersection(entry.get("duplicates", {}).values())
+        }
+        if not more:
+            return sorted(gone)
+        gone |= more
+        lost |= {i for rel in more for i in manifest[rel]["chunk_ids"]}
+
+
+def check_embedding(index_dir: pathlib.Path, embeddings: Embeddings) -> None:
+    """Raise if the index at `index_dir` holds vectors of another model.
+
+    Indexes from before the model was recorded are taken to be real ones:
+    only fake embeddings are refused there.
+    """
+    recorded, model = manifest_embedding(index_dir), model_id(embeddings)
+    fake = isinstance(getattr(embeddings, "inner", embeddings), FakeEmbeddings)
+    if recorded == model or (recorded is None and not fake):
+        return
+    raise ValueError(
+        f"{index_dir} was embedded with {recorded or 'an unrecorded model'}, "
+        f"not {model}: use --rebuild or another index directory"
     )
-    vs = FAISS.from_documents(chunks, emb)
-    vs.save_local(str(INDEX_DIR))
+
+
+def _drop_single_index(root: pathlib.Path) -> None:
+    # the flat, unsharded layout of earlier versions
+    for path in index_files(root) + [root / "index.pkl"]:
+        path.unlink(missing_ok=True)
+    (root / MANIFEST).unlink(missing_ok=True)
+
+
+def ingest_shard(
+    index_dir: pathlib.Path,
+    files: Dict[str, pathlib.Path],
+    embedder: BatchEmbedder,
+    rebuild: bool = False,
+    workers: int = 1,
+    flush_chunks: int = 1024,
+    checkpoint_every: int = 20,
+    dedup: bool = True,
+) -> Dict[str, int]:
+    """Bring one index in line with `files`, embedding only new or changed PDFs.
+
+    Chunks of deleted or changed files are removed from the index in place. An
+    index without a manifest (or `rebuild=True`) is rebuilt from scratch.
+
+    Files stream through parse -> embed -> index: parsed chunks are buffered
+    until `flush_chunks`, then embedded and appended, so only the buffer and
+    the index are in memory. Every `checkpoint_every` files the index and the
+    manifest of the files it fully holds are saved; a new run picks up from
+    there.
+
+    With `dedup`, a chunk that near-duplicates one already in the shard is
+    neither embedded nor indexed. The manifest records which chunk it relies
+    on; when that chunk's file is removed or changed, the files relying on it
+    are re-ingested too (cheaply, from the embedding cache).
+    """
+    vs = None if rebuild else load_index(index_dir, embedder.embeddings)
+    if vs is not None:
+        check_embedding(index_dir, embedder.embeddings)
+    manifest = load_manifest(index_dir) if vs is not None else {}
+    model = model_id(embedder.embeddings)
+
+    seen = NearDuplicateIndex(settings.near_dup_jaccard) if dedup else None
+    if seen is not None and vs is not None:
+        # ids are content hashes: a stored signature is still that chunk's
+        stored = load_signatures(index_dir)
+        for doc_id in vs.index_to_docstore_id.values():
+            sig = stored.get(doc_id)
+            if sig is None:
+                sig = minhash(vs.docstore.search(doc_id).page_content)
+            seen.add(doc_id, sig)
+    duplicates = DedupStats()
+
+    hashes = {rel: file_sha256(path) for rel, path in files.items()}
+    gone = [
+        rel for rel, entry in manifest.items() if hashes.get(rel) != entry["sha256"]
+    ]
+    stale = [
+        i
+        for rel in _with_dependents(manifest, gone)
+        for i in manifest.pop(rel)["chunk_ids"]
+    ]
+    removed_chunks = len(stale)
+
+    def jobs():
+        for rel, path in files.items():
+            if rel not in manifest:
+                yield rel, path, hashes[rel]
+
+    added = since_checkpoint = 0
+    buffer: List[Tuple[str, List[Document]]] = []
+
+    def flush():
+        nonlocal vs, added, since_checkpoint
+        chunks = [c for _, file_chunks in buffer for c in file_chunks]
+        if vs is not None:
+            present = set(vs.index_to_docstore_id.values())
+            # ids left over from a run interrupted before its checkpoint
+            drop = [i for i in stale + [c.id for c in chunks] if i in present]
+            if drop:
+                vs.delete(list(dict.fromkeys(drop)))
+        dup_of: Dict[str, str] = {}
+        if seen is not None:
+            seen.remove(stale + [c.id for c in chunks])
+            kept = []
+            for c in chunks:
+                sig = minhash(c.page_content)
+                original = seen.find(sig)
+                if original is None:
+                    seen.add(c.id, sig)
+                    kept.append(c)
+                else:
+                    dup_of[c.id] = original
+                    duplicates.add(c.page_content)
+            chunks = kept
+        stale.clear()
+        indexed = {c.id for c in chunks}
+        if chunks:
+            new = embed_chunks(chunks, embedder)
+            if vs is None:
+                vs = new
+            else:
+                vs.merge_from(new)
+        for rel, file_chunks in buffer:
+            manifest[rel] = {
+                "sha256": hashes[rel],
+                "chunk_ids": [c.id for c in file_chunks if c.id in indexed],
+                "duplicates": {
+                    c.id: dup_of[c.id] for c in file_chunks if c.id in dup_of
+                },
+            }
+        added += len(chunks)
+        since_checkpoint += len(buffer)
+        buffer.clear()
+
+    for rel, file_chunks in iter_parsed(jobs(), workers):
+        buffer.append((rel, file_chunks))
+        if sum(len(c) for _, c in buffer) >= flush_chunks:
+            flush()
+            if since_checkpoint >= checkpoint_every:
+                save_index(vs, manifest, index_dir, model, seen)
+                since_checkpoint = 0
+    flush()
+
+    if vs is not None:
+        save_index(vs, manifest, index_dir, model, seen)
+    if duplicates.chunks:
+        print(f"[dedup] {index_dir.name}: skipped {duplicates}")
+    return {
+        "added": added,
+        "removed": removed_chunks,
+        "files": len(files),
+        "duplicates": duplicates.chunks,
+        "duplicate_bytes": duplicates.bytes,
+        "duplicate_tokens": duplicates.tokens,
+    }
+
+
+def build_ann(
+    index_dir: pathlib.Path,
+    kind: Optional[str],
+    params: Dict[str, Any],
+    changed: bool,
+) -> Optional[Dict[str, Any]]:
+    """Build the shard's approximate serving index from its exact one.
+
+    `kind=None` keeps the shard's current type; "flat" removes the approximate
+    index. It is rebuilt when the shard changed or the type or its parameters
+    did, and otherwise left as is. Its info records the stamp of the
+    index.faiss it was built from, which serving checks. A shard with too few vectors to train the
+    type (an empty one included) is served flat until it grows.
+    """
+    ann, info_path = index_dir / ANN_INDEX, index_dir / ANN_INFO
+    info = json.loads(info_path.read_text()) if info_path.exists() else None
+    if kind is None:
+        kind = info["kind"] if info else "flat"
+        params = info["params"] if info else {}
+    if kind == "flat":
+        ann.unlink(missing_ok=True)
+        info_path.unlink(missing_ok=True)
+        return None
+    source = index_stamp(index_dir)
+    if (
+        info
+        and not changed
+        and info["kind"] == kind
+        and info["params"] == params
+        and info.get("source") == source
+    ):
+        return info
+
+    flat = faiss.read_index(str(index_dir / "index.faiss"))
+    if flat.ntotal < MIN_VECTORS[kind]:
+        # keep the requested type in the info so a later run builds it
+        ann.unlink(missing_ok=True)
+        info = {
+            "kind": kind,
+            "params": params,
+            "ntotal": int(flat.ntotal),
+            "source": source,
+        }
+        info_path.write_text(json.dumps(info, indent=1))
+        print(f"[ann] {index_dir.name}: {flat.ntotal} vectors, too few for {kind}")
+        return None
+    t0 = time.perf_counter()
+    index = build_index(flat.reconstruct_n(0, flat.ntotal), kind, **params)
+    info = {
+        "kind": kind,
+        "params": params,
+        "ntotal": int(index.ntotal),
+        "bytes": index_bytes(index),
+        "flat_bytes": index_bytes(flat),
+        "build_s": round(time.perf_counter() - t0, 3),
+        "source": source,
+    }
+    tmp = index_dir / ".tmp"
+    tmp.mkdir(exist_ok=True)
+    faiss.write_index(index, str(tmp / ANN_INDEX))
+    (tmp / ANN_INDEX).replace(ann)
+    shutil.rmtree(tmp, ignore_errors=True)
+    info_path.write_text(json.dumps(info, indent=1))
+    print(f"[ann] {index_dir.name}: {info}")
+    return info
+
+
+def ingest(
+    rebuild: bool = False,
+    embeddings: Optional[Embeddings] = None,
+    workers: int = 1,
+    batch_size: int = 64,
+    concurrency: int = 4,
+    flush_chunks: int = 1024,
+    checkpoint_every: int = 20,
+    shards: Optional[List[str]] = None,
+    index_type: Optional[str] = None,
+    index_params: Optional[Dict[str, Any]] = None,
+    dedup: Optional[bool] = None,
+    root: pathlib.Path = INDEX_DIR,
+) -> Dict[str, int]:
+    """Ingest `corpus/` into one index per category under `root`.
+
+    `shards` limits the run to those categories, leaving the others as they
+    are; a full run also drops the shards of categories no longer in corpus/,
+    and the unsharded index of earlier versions, once all shards are saved.
+    `index_type` (see `my_coach.rag.index_types`) adds an approximate index
+    that retrieval searches instead of the exact one. `dedup` defaults to
+    `settings.near_dup`.
+    """
+    embedder = BatchEmbedder(
+        embeddings or _embeddings(),
+        batch_size=batch_size,
+        concurrency=concurrency,
+        on_progress=_print_embed_progress,
+    )
+    present = sorted({shard_of(rel) for rel in corpus_files()})
+    root.mkdir(parents=True, exist_ok=True)
+
+    dedup = settings.near_dup if dedup is None else dedup
+    totals = dict.fromkeys(
+        ["added", "removed", "files"]
+        + ["duplicates", "duplicate_bytes", "duplicate_tokens"],
+        0,
+    )
+    for shard in shards or present:
+        print(f"[shard] {shard}")
+        index_dir = root / shard
+        index_dir.mkdir(parents=True, exist_ok=True)
+        stats = ingest_shard(
+            index_dir,
+            corpus_files(shard),
+            embedder,
+            rebuild=rebuild,
+            workers=workers,
+            flush_chunks=flush_chunks,
+            checkpoint_every=checkpoint_every,
+            dedup=dedup,
+        )
+        for key in totals:
+            totals[key] += stats[key]
+        if (index_dir / "index.faiss").exists():
+            changed = bool(stats["added"] or stats["removed"] or rebuild)
+            build_ann(index_dir, index_type, index_params or {}, changed)
+
+    # only once every shard is saved: a failed run leaves the old index servable
+    if shards is None:
+        _drop_single_index(root)
+        for old in root.iterdir():
+            if (
+                old.is_dir()
+                and not old.name.startswith(".")
+                and old.name not in present
+            ):
+                shutil.rmtree(old)
+    return totals
+
+
+def _index_params(args: argparse.Namespace) -> Dict[str, Any]:
+    # only the knobs of the chosen type, so unrelated flags don't force rebuilds
+    if args.index_type in ("ivf", "ivfpq") and args.nlist:
+        params = {"nlist": args.nlist}
+    else:
+        params = {}
+    if args.index_type in ("ivfpq", "pq"):
+        params["pq_m"] = args.pq_m
+    if args.index_type == "hnsw":
+        params["hnsw_m"] = args.hnsw_m
+    return params
 
 
 if __name__ == "__main__":
-    docs = enrich_metadata(load_docs())
-    chunks = split_docs(docs)
-    print(f"Loaded {len(docs)} docs -> {len(chunks)} chunks")
-    build_index(chunks)
-    print(f"Saved FAISS index to {INDEX_DIR}")
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rebuild", action="store_true", help="re-embed the whole corpus")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--batch-size", type=int, default=64)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--flush-chunks", type=int, default=1024)
+    ap.add_argument("--checkpoint-every", type=int, default=20, help="files")
+    ap.add_argument(
+        "--shard",
+        action="append",
+        dest="shards",
+        help="only (re)build this category; repeatable",
+    )
+    ap.add_argument(
+        "--index-type",
+        choices=INDEX_TYPES,
+        help="approximate index to serve (default: keep each shard's current one)",
+    )
+    ap.add_argument("--nlist", type=int, help="IVF clusters (default ~4 sqrt(n))")
+    ap.add_argument("--pq-m", type=int, default=64, help="PQ bytes per vector")
+    ap.add_argument("--hnsw-m", type=int, default=32, help="HNSW graph degree")
+    ap.add_argument(
+        "--keep-duplicates",
+        action="store_true",
+        help="index near-duplicate chunks too (default: settings.near_dup)",
+    )
+    ap.add_argument(
+        "--fake-embeddings",
+        action="store_true",
+        help=f"local hash embeddings, no API calls (pipeline testing only); "
+        f"writes to {FAKE_INDEX_DIR.relative_to(ROOT)} by default",
+    )
+    ap.add_argument(
+        "--index-dir",
+        type=pathlib.Path,
+        help=f"output directory (default: {INDEX_DIR.relative_to(ROOT)})",
+    )
+    args = ap.parse_args()
+    root = args.index_dir or (FAKE_INDEX_DIR if args.fake_embeddings else INDEX_DIR)
+    if args.fake_embeddings and root.resolve() == INDEX_DIR.resolve():
+        ap.error(f"--fake-embeddings would overwrite the served index in {INDEX_DIR}")
+
+    stats = ingest(
+        rebuild=args.rebuild,
+        embeddings=_embeddings(fake=args.fake_embeddings),
+        workers=args.workers,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        flush_chunks=args.flush_chunks,
+        checkpoint_every=args.checkpoint_every,
+        shards=args.shards,
+        index_type=args.index_type,
+        index_params=_index_params(args),
+        dedup=False if args.keep_duplicates else None,
+        root=root,
+    )
+    print(
+        f"{stats['files']} files: +{stats['added']} chunks, "
+        f"-{stats['removed']} stale chunks"
+    )
+    print(
+        f"Near-duplicates skipped: {stats['duplicates']} chunks, "
+        f"{stats['duplicate_bytes'] / 1e3:.1f} kB, ~{stats['duplicate_tokens']} tokens"
+    )
+    print(f"Saved FAISS index to {root}")
+    print(f"Embedding cache: {get_embedding_cache().stats()}")
@@ -0,0 +1,68 @@
+"""Stdio MCP server standing in for garth-mcp-server, for the checks in scripts/.
+
+Exposes the same `snapshot(from_date, to_date)` tool, answering with one
+synthetic run per day, and a `crash` tool that kills the server. Each start
+and each call is appended as a JSON line (with the server's pid) to
+$STUB_MCP_LOG, so a check can assert what the client actually asked for and
+how many servers it spawned.
+
+    python my_coach/scripts/stub_mcp_server.py
+"""
+
+import json
+import os
+from datetime import date, timedelta
+
+from mcp.server.fastmcp import FastMCP
+
+mcp = FastMCP("stub-garmin")
+
+
+def _record(tool: str, arguments: dict) -> None:
+    log = os.environ.get("STUB_MCP_LOG")
+    if log:
+        with open(log, "a", encoding="utf-8") as f:
+            record = {"tool": tool, "arguments": arguments, "pid": os.getpid()}
+            f.write(json.dumps(record) + "\n")
+
+
+@mcp.tool()
+def snapshot(from_date: str, to_date: str) -> dict:
+    """One 10 km run per day between the two dates (YYYY-MM-DD)."""
+    _record("snapshot", {"from_date": from_date, "to_date": to_date})
+    day, end = date.fromisoformat(from_date), date.fromisoformat(to_date)
+    activities = []
+    while day <= end:
+        activities.append(
+            {
+                "activityId": day.toordinal(),
+                "startTimeLocal": f"{day.isoformat()} 07:00:00",
+                "activityType": {"typeKey": "running"},
+                "distance": 10000.0,
+                "duration": 3000.0,
+            }
+        )
+        day += timedelta(days=1)
+    return {
+        "result": {"SnapshotFitnessDetails": {"payload": {"activityList": activities}}}
+    }
+
+
+@mcp.tool()
+def crash() -> str:
+    """Kill the server mid-call, as a dead transport would look to the pool."""
+    _record("crash", {})
+    os._exit(1)
+
+
+def read_calls(log: str) -> list:
+    """The recorded calls, oldest first."""
+    if not os.path.exists(log):
+        return []
+    with open(log, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+if __name__ == "__main__":
+    _record("start", {})
+    mcp.run()
@@ -1,14 +1,31 @@
+import logging
 import os
+import time
 import chainlit as cl
 from langchain_core.messages import AIMessage, AIMessageChunk
 from langgraph.graph import START
 from langchain_core.runnables.config import RunnableConfig
 from my_coach.llm import init_llms
 from my_coach.graph import build_graph
+from my_coach.graph.utils import start_warm_up
 
+logger = logging.getLogger(__name__)
 
+_t0 = time.perf_counter()
 llms = init_llms()
+_t1 = time.perf_counter()
 graph = build_graph(llms)
+logger.info(
+    "LLM clients in %.2fs, graph compiled in %.2fs",
+    _t1 - _t0,
+    time.perf_counter() - _t1,
+)
+
+
+@cl.on_app_startup
+def warm_up_index():
+    # once per server, not per import: the index loads while the app starts
+    start_warm_up()
 
 
 def _make_config():
@@ -22,12 +39,12 @@ async def _run_graph(entry: str):
     await out.send()
 
     # We set start_route here; no need to send a fake "Hello"
-    graph.update_state(config, values={"start_route": entry}, as_node=START)
-    stream = graph.stream(
+    await graph.aupdate_state(config, values={"start_route": entry}, as_node=START)
+    stream = graph.astream(
         {"messages": ["Hello"]}, stream_mode="messages", config=config
     )
 
-    for msg_chunk, meta in stream:
+    async for msg_chunk, meta in stream:
         if (
             isinstance(msg_chunk, AIMessage)
             and msg_chunk.content
@@ -44,7 +61,9 @@ async def start():
     tav = True if os.environ.get("TAVILY_API_KEY") else False
     gar = True if os.environ.get("GARTH_TOKEN") else False
 
-    graph.update_state(config=config, values={"search": tav, "garmin_consent": gar})
+    await graph.aupdate_state(
+        config=config, values={"search": tav, "garmin_consent": gar}
+    )
 
     res = await cl.AskActionMessage(
         content=(
@@ -74,13 +93,13 @@ async def chat_stream(user_msg: cl.Message):
     out_msg = cl.Message("")
     await out_msg.send()
 
-    stream = graph.stream(
+    stream = graph.astream(
         {"messages": [{"role": "user", "content": user_msg.content}]},
         stream_mode="messages",
         config=config,
     )
 
-    for msg_chunk, _meta in stream:
+    async for msg_chunk, _meta in stream:
         if (
             isinstance(msg_chunk, AIMessageChunk)
             and msg_chunk.content
@@ -92,6 +111,10 @@ async def chat_stream(user_msg: cl.Message):
         if isinstance(msg_chunk, AIMessage) and not isinstance(
             msg_chunk, AIMessageChunk
         ):
+            # whole messages written by nodes (e.g. the rendered plan) arrive
+            # once, unstreamed; LLM answers were streamed above already
+            if msg_chunk.content and msg_chunk.additional_kwargs.get("visible", True):
+                await out_msg.stream_token(str(msg_chunk.content))
             await out_msg.stream_token("\n\n")
 
     await out_msg.update()